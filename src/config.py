@@ -5,22 +5,71 @@ config.py
 Глобальная конфигурация проекта в виде dataclass.
 Она импортируется из всех остальных модулей, чтобы
 не дублировать параметры (пути, гиперпараметры и т. д.).
+
+Значения собираются слоями (каждый следующий перекрывает предыдущий):
+    1. умолчания dataclass-ов ниже;
+    2. config.yaml в корне репозитория (или файл из $DISHES_CONFIG);
+    3. профиль хоста — секция profiles.<имя> того же yaml, где имя —
+       $DISHES_PROFILE или hostname машины (threads, workers, batch, backend, device …);
+    4. переменные окружения DISHES__<СЕКЦИЯ>__<ПАРАМЕТР>, напр. DISHES__TRAIN__DEVICE=cpu;
+    5. флаги CLI (их умолчания берутся из уже собранного CFG).
+Итог валидируется, а dump_config() сохраняет его в каталог каждого запуска.
 """
 
-from dataclasses import dataclass, field
+import copy
+import os
+import platform
+from dataclasses import asdict, dataclass, field, fields, is_dataclass
 from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union, get_args, get_origin, get_type_hints
+
+import yaml
 
 @dataclass
 class Paths:
-    """Собирает все пути проекта в одном месте."""
+    """
+    Собирает все пути проекта в одном месте.
+    Незаданные (None) пути выводятся из root / data_raw / runs в __post_init__,
+    поэтому переопределение, напр., paths.data_raw переносит и frames, labels, mined.
+    Относительные пути считаются от root.
+    """
     root: Path = Path(__file__).resolve().parents[1]                          # корень репозитория
-    data_raw: Path = root / "data" / "raw"                                    # сырые данные
-    data_processed: Path = root / "data" / "processed"                        # после аугментации
-    dataset: Path = root / "data" / "dataset"                                 # готовый датасет YOLO
-    frames: Path = data_raw / "frames"                                        # кадры из видео
-    labels: Path = data_raw / "labels"                                        # разметка кадров
-    figures: Path = root / "report" / "figures"                               # графики
-    runs: Path = root / "runs"                                                # лог-директория Ultralytics
+    data_raw: Optional[Path] = None                                           # сырые данные (root/data/raw)
+    data_processed: Optional[Path] = None                                     # после аугментации (root/data/processed)
+    dataset: Optional[Path] = None                                            # готовый датасет YOLO (root/data/dataset)
+    dataset_lazy: Optional[Path] = None                                       # сплит исходных кадров (ссылки) для аугментации на лету
+    dataset_distill: Optional[Path] = None                                    # train + псевдо-разметка учителя
+    frames: Optional[Path] = None                                             # кадры из видео (data_raw/frames)
+    labels: Optional[Path] = None                                             # разметка кадров (data_raw/labels)
+    pseudo_labels: Optional[Path] = None                                      # псевдо-разметка модели, не ручная! (data_raw/pseudo_labels)
+    figures: Optional[Path] = None                                            # графики (root/report/figures)
+    runs: Optional[Path] = None                                               # лог-директория Ultralytics (root/runs)
+    mined: Optional[Path] = None                                              # отобранные hard-example кадры (data_raw/mined)
+    selected: Optional[Path] = None                                           # модель для деплоя (runs/selected.json)
+
+    def __post_init__(self):
+        # явно заданные значения — чтобы при наложении следующего слоя пересобрать производные пути
+        self._given = {f.name: getattr(self, f.name) for f in fields(self) if getattr(self, f.name) is not None}
+        self.root = Path(self.root)
+
+        def resolve(name: str, default: Path) -> None:
+            value = getattr(self, name)
+            path = default if value is None else Path(value)
+            setattr(self, name, path if path.is_absolute() else self.root / path)
+
+        data = self.root / "data"
+        resolve("data_raw", data / "raw")
+        resolve("runs", self.root / "runs")
+        resolve("data_processed", data / "processed")
+        resolve("dataset", data / "dataset")
+        resolve("dataset_lazy", data / "dataset_lazy")
+        resolve("dataset_distill", data / "dataset_distill")
+        resolve("frames", self.data_raw / "frames")
+        resolve("labels", self.data_raw / "labels")
+        resolve("pseudo_labels", self.data_raw / "pseudo_labels")
+        resolve("mined", self.data_raw / "mined")
+        resolve("figures", self.root / "report" / "figures")
+        resolve("selected", self.runs / "selected.json")
 
 @dataclass
 class ExtractConfig:
@@ -28,6 +77,18 @@ class ExtractConfig:
     fps: int = 2                                                               # сколько кадров в секунду сохранять
     img_suffix: str = ".jpg"                                                   # расширение выходных файлов
 
+@dataclass
+class MineConfig:
+    """Параметры отбора «трудных» кадров из нового видео (src/data/mine_frames.py)."""
+    step: int = 5                                                              # анализируем каждый step-й кадр
+    top_k: int = 200                                                           # сколько кадров выгружать в CVAT
+    min_gap: int = 3                                                           # мин. расстояние (в шагах) между отобранными
+    conf: float = 0.05                                                         # порог детекций для оценки неопределённости
+    pre_conf: float = 0.25                                                     # порог боксов для предразметки
+    w_conf: float = 1.0                                                        # вес «низкой max-conf»
+    w_disagree: float = 1.0                                                    # вес расхождения двух моделей
+    w_flicker: float = 1.0                                                     # вес мерцания между соседними кадрами
+
 @dataclass
 class TrainConfig:
     """Гиперпараметры обучения YOLOv11."""
@@ -38,12 +99,270 @@ class TrainConfig:
     lr0: float = 0.01                                                          # начальная learning rate
     device: str = "0"                                                          # GPU id, "cpu" если без видеокарты
 
+@dataclass
+class PseudoConfig:
+    """Псевдо-разметка неразмеченных кадров (src/data/pseudo_label.py)."""
+    conf: float = 0.6                                                          # порог по умолчанию для всех классов
+    class_conf: Dict[str, float] = field(default_factory=dict)                 # поклассовые пороги, напр. {"knife": 0.75}
+    ambiguous: float = 0.25                                                    # бокс в [ambiguous, порог) → кадр пропускается
+    batch: int = 64                                                            # batch-size инференса
+    weight: float = 1.0                                                        # вес псевдо-сэмплов в train (<1 — прореживание, >1 — повтор)
+
+@dataclass
+class DistillConfig:
+    """Дистилляция teacher → student (src/models/distill.py)."""
+    missed_iou: float = 0.5                                                    # бокс учителя с IoU < порога ко всей разметке — «пропущен» разметчиком
+
+@dataclass
+class SelectConfig:
+    """Выбор модели для деплоя по латентности/точности (src/models/select_model.py)."""
+    budget_ms: float = 50.0                                                    # бюджет CPU-латентности, мс/кадр
+    img_size: int = 640                                                        # деплойный imgsz
+    batch: int = 1                                                             # деплойный batch
+
+@dataclass
+class VideoConfig:
+    """Параметры записи видео с боксами (см. src/utils/video.py)."""
+    backend: str = "auto"                                                      # auto | ffmpeg | opencv
+    codec: str = "libx264"                                                     # кодек ffmpeg
+    preset: str = "veryfast"                                                   # preset x264/x265
+    crf: int = 23                                                              # качество x264/x265 (меньше → лучше)
+    queue: int = 64                                                            # длина очереди async-записи, 0 → синхронно
+
+@dataclass
+class InferConfig:
+    """Инференс видео (src/models/infer_video.py, infer_batch.py) — типичные настройки хоста."""
+    img_size: int = 640                                                        # сторона входа сети
+    conf: float = 0.25                                                         # порог confidence
+    batch: int = 16                                                            # кадров в батче
+    workers: int = 1                                                           # процессов в пакетном режиме
+    threads: int = 0                                                           # torch-потоков на воркер, 0 → cpu_count // workers
+    device: str = ""                                                           # "" → авто (Ultralytics), "cpu", "0" …
+
+@dataclass
+class StreamConfig:
+    """Потоковый инференс камер / RTSP / FIFO (src/models/stream.py)."""
+    loop: bool = False                                                         # файл-источник — по кругу
+    reconnect: int = 5                                                         # попыток переподключения живого потока
+    reconnect_delay: float = 2.0                                               # пауза между попытками, с
+    report_every: float = 5.0                                                  # период лога p50/p95 и drop-rate, с
+    latency_window: int = 1000                                                 # p50/p95 — по последним N кадрам
+
+@dataclass
+class CameraROI:
+    """
+    Region-of-interest одной стационарной камеры (координаты нормированы 0-1).
+    Задаётся rect или polygon; exclude — статичные области, которые закрашиваются.
+    """
+    rect: Optional[Tuple[float, float, float, float]] = None                   # x0, y0, x1, y1
+    polygon: Optional[List[Tuple[float, float]]] = None                        # [(x, y), ...]
+    exclude: List[List[Tuple[float, float]]] = field(default_factory=list)     # [[(x, y), ...], ...]
+
 @dataclass
 class ProjectConfig:
     """Корневой контейнер для всех групп параметров."""
     paths: Paths = field(default_factory=Paths)
     extract: ExtractConfig = field(default_factory=ExtractConfig)
+    mine: MineConfig = field(default_factory=MineConfig)
     train: TrainConfig = field(default_factory=TrainConfig)
+    pseudo: PseudoConfig = field(default_factory=PseudoConfig)
+    distill: DistillConfig = field(default_factory=DistillConfig)
+    select: SelectConfig = field(default_factory=SelectConfig)
+    infer: InferConfig = field(default_factory=InferConfig)
+    stream: StreamConfig = field(default_factory=StreamConfig)
+    video: VideoConfig = field(default_factory=VideoConfig)
+    # ROI по именам камер, напр. {"line1": CameraROI(rect=(0.2, 0.35, 0.8, 1.0))}
+    roi: Dict[str, CameraROI] = field(default_factory=dict)
+
+# ───────────────────── слои конфигурации ─────────────────────
+ENV_PREFIX = "DISHES__"
+BACKENDS = ("auto", "ffmpeg", "opencv")                                        # бэкенды записи (src/utils/video.py)
+
+
+class ConfigError(ValueError):
+    """Неизвестный параметр или недопустимое значение в одном из слоёв."""
+
+
+def _coerce(tp: Any, value: Any, where: str) -> Any:
+    """Приводит *value* (из yaml / env) к типу поля *tp*."""
+    origin = get_origin(tp)
+    if origin is Union:                                                        # Optional[X]
+        if value is None:
+            return None
+        return _coerce(next(a for a in get_args(tp) if a is not type(None)), value, where)
+    if is_dataclass(tp):
+        if not isinstance(value, dict):
+            raise ConfigError(f"{where}: ожидалась секция, получено {value!r}")
+        hints = get_type_hints(tp)
+        for k in value:
+            if k not in hints:
+                raise ConfigError(f"Неизвестный параметр «{where}.{k}»")
+        return tp(**{k: _coerce(hints[k], v, f"{where}.{k}") for k, v in value.items()})
+    if origin is dict:
+        if not isinstance(value, dict):
+            raise ConfigError(f"{where}: ожидался словарь, получено {value!r}")
+        _, vt = get_args(tp)
+        return {str(k): _coerce(vt, v, f"{where}.{k}") for k, v in value.items()}
+    if origin in (list, tuple):
+        if not isinstance(value, (list, tuple)):
+            raise ConfigError(f"{where}: ожидался список, получено {value!r}")
+        args = get_args(tp)
+        if origin is tuple and args and args[-1] is not Ellipsis:
+            if len(args) != len(value):
+                raise ConfigError(f"{where}: ожидалось {len(args)} значений, получено {len(value)}")
+            types = args
+        else:
+            types = [args[0] if args else Any] * len(value)
+        return origin(_coerce(t, v, f"{where}[{i}]") for i, (t, v) in enumerate(zip(types, value)))
+    if tp is Any:
+        return value
+    if tp is bool:
+        if isinstance(value, str) and value.lower() in ("1", "true", "yes", "on", "0", "false", "no", "off"):
+            return value.lower() in ("1", "true", "yes", "on")
+        if not isinstance(value, bool):
+            raise ConfigError(f"{where}: ожидалось true/false, получено {value!r}")
+        return value
+    if tp is int and isinstance(value, float) and not value.is_integer():
+        raise ConfigError(f"{where}: ожидалось целое, получено {value!r}")
+    try:
+        return tp(value)
+    except (TypeError, ValueError) as e:
+        raise ConfigError(f"{where}: ожидался {tp.__name__}, получено {value!r}") from e
+
+
+def merge(obj: Any, data: Dict[str, Any], where: str = "") -> Any:
+    """Накладывает словарь *data* на dataclass *obj* (вложенные секции — рекурсивно)."""
+    hints = get_type_hints(type(obj))
+    known = {f.name for f in fields(obj)}
+    for key, value in (data or {}).items():
+        path = f"{where}.{key}" if where else str(key)
+        if key not in known:
+            raise ConfigError(f"Неизвестный параметр «{path}»")
+        current = getattr(obj, key)
+        if isinstance(current, Paths) and isinstance(value, dict):
+            # пути пересобираются целиком, чтобы производные последовали за data_raw / runs
+            setattr(obj, key, _coerce(Paths, {**current._given, **value}, path))
+        elif is_dataclass(current) and isinstance(value, dict):
+            merge(current, value, path)
+        elif isinstance(current, dict) and isinstance(value, dict):
+            # словари (roi, pseudo.class_conf) дополняются по ключам, а не заменяются целиком
+            _, vt = get_args(hints[key])
+            merged = dict(current)
+            for k, v in value.items():
+                k = str(k)
+                if is_dataclass(merged.get(k)) and isinstance(v, dict):
+                    merged[k] = merge(copy.deepcopy(merged[k]), v, f"{path}.{k}")
+                else:
+                    merged[k] = _coerce(vt, v, f"{path}.{k}")
+            setattr(obj, key, merged)
+        else:
+            setattr(obj, key, _coerce(hints[key], value, path))
+    return obj
+
+
+def _env_layer(environ: Dict[str, str]) -> Dict[str, Any]:
+    """DISHES__TRAIN__DEVICE=cpu → {"train": {"device": "cpu"}} (значение разбирается как yaml)."""
+    out: Dict[str, Any] = {}
+    for name, raw in environ.items():
+        if not name.startswith(ENV_PREFIX):
+            continue
+        *sections, key = name[len(ENV_PREFIX):].lower().split("__")
+        node = out
+        for sec in sections:
+            node = node.setdefault(sec, {})
+        node[key] = yaml.safe_load(raw) if raw.strip() else ""
+    return out
+
+
+def validate(cfg: "ProjectConfig") -> "ProjectConfig":
+    """Проверяет значения после наложения всех слоёв; все ошибки — одним исключением."""
+    errors = []
+    for name, size in (("train.img_size", cfg.train.img_size), ("infer.img_size", cfg.infer.img_size),
+                       ("select.img_size", cfg.select.img_size)):
+        if size <= 0 or size % 32:
+            errors.append(f"{name}={size}: нужно положительное кратное 32")
+    for name, n in (("train.batch", cfg.train.batch), ("infer.batch", cfg.infer.batch),
+                    ("pseudo.batch", cfg.pseudo.batch), ("select.batch", cfg.select.batch),
+                    ("infer.workers", cfg.infer.workers), ("extract.fps", cfg.extract.fps),
+                    ("train.epochs", cfg.train.epochs)):
+        if n < 1:
+            errors.append(f"{name}={n}: должно быть ≥ 1")
+    for name, c in (("infer.conf", cfg.infer.conf), ("pseudo.conf", cfg.pseudo.conf),
+                    ("pseudo.ambiguous", cfg.pseudo.ambiguous), ("distill.missed_iou", cfg.distill.missed_iou),
+                    *((f"pseudo.class_conf.{k}", v) for k, v in cfg.pseudo.class_conf.items())):
+        if not 0.0 <= c <= 1.0:
+            errors.append(f"{name}={c}: ожидается значение в [0, 1]")
+    if cfg.infer.threads < 0:
+        errors.append(f"infer.threads={cfg.infer.threads}: должно быть ≥ 0")
+    if cfg.video.backend not in BACKENDS:
+        errors.append(f"video.backend={cfg.video.backend!r}: одно из {BACKENDS}")
+    if not 0 <= cfg.video.crf <= 51:
+        errors.append(f"video.crf={cfg.video.crf}: ожидается 0…51")
+    if cfg.stream.reconnect < 0 or cfg.stream.reconnect_delay < 0 or cfg.stream.report_every < 0:
+        errors.append("stream.reconnect / reconnect_delay / report_every: должны быть ≥ 0")
+    if cfg.stream.latency_window < 1:
+        errors.append(f"stream.latency_window={cfg.stream.latency_window}: должно быть ≥ 1")
+    if cfg.select.budget_ms <= 0:
+        errors.append(f"select.budget_ms={cfg.select.budget_ms}: должно быть > 0")
+    if errors:
+        raise ConfigError("Некорректная конфигурация:\n  " + "\n  ".join(errors))
+    return cfg
+
+
+def load_config(path: Optional[Path] = None, profile: Optional[str] = None,
+                environ: Optional[Dict[str, str]] = None) -> Tuple["ProjectConfig", List[str]]:
+    """
+    Собирает конфигурацию по слоям (см. docstring модуля).
+    :returns: (конфиг, список применённых слоёв — для dump_config)
+    """
+    environ = os.environ if environ is None else environ
+    cfg, sources = ProjectConfig(), ["defaults"]
+    path = Path(path or environ.get("DISHES_CONFIG") or cfg.paths.root / "config.yaml")
+    if path.exists():
+        with open(path) as f:
+            data = yaml.safe_load(f) or {}
+        profiles = data.pop("profiles", {}) or {}
+        merge(cfg, data)
+        sources.append(str(path))
+        profile = profile or environ.get("DISHES_PROFILE") or platform.node()
+        if profile in profiles:
+            merge(cfg, profiles[profile], f"profiles.{profile}")
+            sources.append(f"profile:{profile}")
+        elif environ.get("DISHES_PROFILE"):
+            raise ConfigError(f"Профиль «{profile}» не найден в {path}")
+    env = _env_layer(environ)
+    if env:
+        merge(cfg, env, "env")
+        sources.append("env")
+    return validate(cfg), sources
+
+
+def _plain(value: Any) -> Any:
+    if isinstance(value, Path):
+        return str(value)
+    if isinstance(value, dict):
+        return {k: _plain(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_plain(v) for v in value]
+    return value
+
+
+def dump_config(run_dir: Path, cli: Optional[Dict[str, Any]] = None) -> Path:
+    """
+    Пишет итоговую конфигурацию запуска в <run_dir>/config.yaml.
+    *cli* — значения флагов в виде секций ({"train": {"batch": 8}}); они
+    валидируются и накладываются последним слоем поверх CFG.
+    """
+    cfg = copy.deepcopy(CFG)
+    if cli:
+        validate(merge(cfg, cli, "cli"))
+    run_dir.mkdir(parents=True, exist_ok=True)
+    out = run_dir / "config.yaml"
+    with open(out, "w") as f:
+        yaml.safe_dump({"sources": CFG_SOURCES + (["cli"] if cli else []), "host": platform.node(),
+                        "config": _plain(asdict(cfg))}, f, allow_unicode=True, sort_keys=False)
+    return out
+
 
 # Экземпляр, который удобно импортировать
-CFG = ProjectConfig()
+CFG, CFG_SOURCES = load_config()
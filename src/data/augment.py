@@ -3,10 +3,13 @@
 """
 augment.py
 Применяет набор аугментаций Albumentations к каждому изображению+разметке.
-Запуск: python -m src.data.augment
+Запуск: python -m src.data.augment [--pseudo]
+--pseudo: дополнительно аугментировать кадры с псевдо-разметкой (data/raw/pseudo_labels);
+          их копии получают в имени метку _pseudo, чтобы split_dataset мог их отличить.
 """
 
 from pathlib import Path
+import argparse
 import albumentations as A
 import cv2
 import numpy as np
@@ -53,19 +56,27 @@ def augment_image(img_path: Path, label_path: Path, dst_img: Path, dst_lbl: Path
         for (x, y, w, h), cls in zip(aug_bboxes, aug_labels):
             f.write(f"{cls} {x:.6f} {y:.6f} {w:.6f} {h:.6f}\n")
 
-def run():
+def run(include_pseudo: bool = False):
     src_imgs = list((CFG.paths.frames).glob("*.jpg"))
     logger.info(f"Augmenting {len(src_imgs)} images")
+    pseudo = 0
     for img in tqdm(src_imgs):
-        label = CFG.paths.labels / (img.stem + ".txt")
+        label, tag = CFG.paths.labels / (img.stem + ".txt"), ""
+        if not label.exists() and include_pseudo:
+            label, tag = CFG.paths.pseudo_labels / (img.stem + ".txt"), "_pseudo"
         if not label.exists():
             logger.warning(f"No label for {img.name}; skipping")
             continue
+        pseudo += bool(tag)
         for idx in range(3):  # создаём 3 аугментированных копии
-            dst_img = CFG.paths.data_processed / f"{img.stem}_aug{idx}.jpg"
-            dst_lbl = CFG.paths.data_processed / f"{img.stem}_aug{idx}.txt"
+            dst_img = CFG.paths.data_processed / f"{img.stem}{tag}_aug{idx}.jpg"
+            dst_lbl = CFG.paths.data_processed / f"{img.stem}{tag}_aug{idx}.txt"
             augment_image(img, label, dst_img, dst_lbl)
+    if include_pseudo:
+        logger.info(f"Из них с псевдо-разметкой: {pseudo}")
 
 if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--pseudo", action="store_true", help="включить кадры с псевдо-разметкой")
     CFG.paths.data_processed.mkdir(parents=True, exist_ok=True)
-    run()
+    run(ap.parse_args().pseudo)
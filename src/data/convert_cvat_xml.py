@@ -2,6 +2,7 @@
 convert_cvat_xml.py
 Преобразует файл annotations.xml (CVAT 1.1) в набор
 YOLO-текстовиков по одному файлу на кадр.
+Обратное направление (предразметка для импорта в CVAT) — write_cvat_xml().
 
 Запуск:
     python -m src.data.convert_cvat_xml \
@@ -39,6 +40,37 @@ def box_to_yolo(xtl, ytl, xbr, ybr, img_w, img_h):
     h  = (ybr - ytl) / img_h
     return xc, yc, w, h
 
+def yolo_to_box(xc, yc, w, h, img_w, img_h):
+    """Нормированные (0-1) → пиксельные xtl, ytl, xbr, ybr (обратное box_to_yolo)."""
+    return ((xc - w / 2) * img_w, (yc - h / 2) * img_h,
+            (xc + w / 2) * img_w, (yc + h / 2) * img_h)
+
+def write_cvat_xml(images, xml_path: Path):
+    """
+    Пишет предразметку в формате CVAT 1.1 (импорт: «CVAT for images 1.1»).
+    :param images: список (fname, img_w, img_h, [(class_id, xc, yc, w, h), ...]) в YOLO-координатах
+    """
+    root = ET.Element("annotations")
+    ET.SubElement(root, "version").text = "1.1"
+    labels = ET.SubElement(ET.SubElement(ET.SubElement(root, "meta"), "task"), "labels")
+    for name in CLASSES:
+        ET.SubElement(ET.SubElement(labels, "label"), "name").text = name
+
+    for idx, (fname, img_w, img_h, boxes) in enumerate(images):
+        image = ET.SubElement(root, "image", id=str(idx), name=fname,
+                              width=str(int(img_w)), height=str(int(img_h)))
+        for cls, xc, yc, w, h in boxes:
+            xtl, ytl, xbr, ybr = yolo_to_box(xc, yc, w, h, img_w, img_h)
+            ET.SubElement(image, "box", label=CLASSES[int(cls)], source="auto", occluded="0",
+                          xtl=f"{max(0.0, xtl):.2f}", ytl=f"{max(0.0, ytl):.2f}",
+                          xbr=f"{min(img_w, xbr):.2f}", ybr=f"{min(img_h, ybr):.2f}", z_order="0")
+
+    xml_path.parent.mkdir(parents=True, exist_ok=True)
+    tree = ET.ElementTree(root)
+    ET.indent(tree)
+    tree.write(xml_path, encoding="utf-8", xml_declaration=True)
+    logger.info(f"CVAT XML: {len(images)} images → {xml_path}")
+
 def convert(xml_path: Path, out_dir: Path):
     out_dir.mkdir(parents=True, exist_ok=True)
     tree = ET.parse(xml_path)
@@ -0,0 +1,89 @@
+# src/data/lazy_dataset.py
+
+"""
+lazy_dataset.py
+Аугментация «на лету» вместо трёх JPEG-копий в data/processed.
+
+AlbumentationsDataset применяет тот же пайплайн augment.transform к каждому
+сэмплу при каждом обращении — то есть заново в каждой эпохе и прямо в
+воркерах DataLoader-а. На диск ничего не пишется и JPEG не пережимается:
+исходные кадры лишь раскладываются ссылками (split_dataset --lazy).
+
+LazyAugTrainer подменяет датасет только для mode="train"; val/test остаются
+стандартными. Использование: python -m src.models.train --lazy-aug
+"""
+
+from __future__ import annotations
+
+import numpy as np
+from ultralytics.data.dataset import YOLODataset
+from ultralytics.models.yolo.detect import DetectionTrainer
+from ultralytics.utils import colorstr
+from ultralytics.utils.instance import Instances
+
+from src.data.augment import transform
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+def _xywh_clip(b: np.ndarray) -> np.ndarray:
+    """Обрезает нормированные xywh по границам кадра (Albumentations строго проверяет диапазон 0-1)."""
+    xyxy = np.concatenate([b[:, :2] - b[:, 2:] / 2, b[:, :2] + b[:, 2:] / 2], 1).clip(0.0, 1.0)
+    return np.concatenate([(xyxy[:, :2] + xyxy[:, 2:]) / 2, xyxy[:, 2:] - xyxy[:, :2]], 1)
+
+
+class AlbumentationsDataset(YOLODataset):
+    """YOLODataset, который прогоняет каждый загруженный кадр через augment.transform."""
+
+    def get_image_and_label(self, index):
+        label = super().get_image_and_label(index)
+        inst: Instances = label["instances"]
+        h, w = label["img"].shape[:2]
+        inst.convert_bbox("xywh")
+        if not inst.normalized:
+            inst.normalize(w, h)
+
+        boxes = _xywh_clip(inst.bboxes.astype(np.float32))
+        keep = (boxes[:, 2] > 0) & (boxes[:, 3] > 0)
+        cls = label["cls"].reshape(-1)[keep]
+
+        out = transform(image=label["img"], bboxes=boxes[keep], class_labels=cls.tolist())
+
+        label["img"] = out["image"]
+        label["cls"] = np.asarray(out["class_labels"], dtype=np.float32).reshape(-1, 1)
+        label["instances"] = Instances(
+            np.asarray(out["bboxes"], dtype=np.float32).reshape(-1, 4),
+            segments=np.zeros((0, 1000, 2), dtype=np.float32),
+            bbox_format="xywh",
+            normalized=True,
+        )
+        return label
+
+
+class LazyAugTrainer(DetectionTrainer):
+    """DetectionTrainer с AlbumentationsDataset для обучающего сплита."""
+
+    def build_dataset(self, img_path, mode="train", batch=None):
+        if mode != "train":
+            return super().build_dataset(img_path, mode, batch)
+        model = getattr(self.model, "module", self.model)
+        gs = max(int(model.stride.max() if model is not None else 0), 32)
+        cfg = self.args
+        return AlbumentationsDataset(
+            img_path=img_path,
+            imgsz=cfg.imgsz,
+            batch_size=batch,
+            augment=True,
+            hyp=cfg,
+            rect=cfg.rect,
+            cache=cfg.cache or None,
+            single_cls=cfg.single_cls or False,
+            stride=gs,
+            pad=0.0,
+            prefix=colorstr(f"{mode} (lazy aug): "),
+            task=cfg.task,
+            classes=cfg.classes,
+            data=self.data,
+            fraction=cfg.fraction,
+        )
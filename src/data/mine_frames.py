@@ -0,0 +1,199 @@
+# src/data/mine_frames.py
+
+"""
+mine_frames.py
+Hard-example mining: прогоняет текущую лучшую модель по новому видео,
+оценивает «информативность» каждого step-го кадра и выгружает только top-K
+самых неуверенных кадров вместе с предразметкой в CVAT XML.
+
+Оценка кадра — взвешенная сумма трёх сигналов (все в диапазоне 0-1):
+    • conf     — 1 − максимальный confidence на кадре (нет детекций → 0);
+    • disagree — расхождение с второй моделью (--second-weights, напр. yolo11x):
+                 1 − 2·совпавшие / (боксы A + боксы B), класс + IoU ≥ 0.5;
+    • flicker  — то же самое, но между соседними проанализированными кадрами
+                 одной модели (детекции «мигают» → модель не уверена).
+
+Запуск:
+    python -m src.data.mine_frames --video data/raw/new_clip.mp4 \
+           --weights runs/exp11_n/weights/best.pt \
+           --second-weights runs/exp11_x/weights/best.pt --top-k 200
+Создаст data/raw/mined/images/*.jpg и data/raw/mined/annotations.xml для импорта в CVAT.
+После разметки: convert_cvat_xml → data/raw/labels, кадры → data/raw/frames.
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+from pathlib import Path
+from typing import List, Optional
+
+import cv2
+import numpy as np
+from tqdm import tqdm
+
+from src.config import CFG
+from src.data.convert_cvat_xml import write_cvat_xml
+from src.utils.logger import get_logger
+from src.utils.metrics import match_predictions
+
+logger = get_logger(__name__)
+
+
+# ─────────────────────────── сигналы ───────────────────────────────────
+def _dets(res) -> tuple:
+    """Ultralytics Results → (xyxyn, conf, cls) в NumPy."""
+    b = res.boxes
+    return b.xyxyn.cpu().numpy(), b.conf.cpu().numpy(), b.cls.cpu().numpy().astype(int)
+
+def agreement(a: tuple, b: tuple, iou: float = 0.5) -> float:
+    """Доля совпавших боксов двух наборов (класс + IoU ≥ iou); два пустых набора — полное согласие."""
+    n = len(a[0]) + len(b[0])
+    if n == 0:
+        return 1.0
+    matched = match_predictions(a[0], a[2], b[0], b[2], np.array([iou])).sum()
+    return 2.0 * matched / n
+
+def to_yolo(d: tuple, min_conf: float) -> list:
+    """Детекции → [(cls, xc, yc, w, h), ...] для предразметки."""
+    xyxy, conf, cls = d
+    out = []
+    for (x0, y0, x1, y1), c, k in zip(xyxy, conf, cls):
+        if c >= min_conf:
+            out.append((int(k), float(x0 + x1) / 2, float(y0 + y1) / 2, float(x1 - x0), float(y1 - y0)))
+    return out
+
+
+# ─────────────────────────── оценка видео ──────────────────────────────
+def score_video(video: Path, model, second=None, step: int = CFG.mine.step,
+                imgsz: int = CFG.train.img_size, batch: int = CFG.train.batch) -> List[dict]:
+    """Проходит ролик и возвращает по записи на каждый step-й кадр."""
+    cap = cv2.VideoCapture(str(video))
+    total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    records: List[dict] = []
+    prev: Optional[tuple] = None
+    frames, idxs = [], []
+
+    def flush():
+        nonlocal prev
+        kw = dict(imgsz=imgsz, conf=CFG.mine.conf, verbose=False)
+        res_a = model(frames, **kw)
+        res_b = second(frames, **kw) if second is not None else [None] * len(frames)
+        for f, idx, ra, rb in zip(frames, idxs, res_a, res_b):
+            da = _dets(ra)
+            rec = {
+                "video": str(video),
+                "frame": idx,
+                "width": f.shape[1],
+                "height": f.shape[0],
+                "conf": float(1.0 - da[1].max()) if len(da[1]) else 0.0,
+                "disagree": 1.0 - agreement(da, _dets(rb)) if rb is not None else 0.0,
+                "flicker": 1.0 - agreement(da, prev) if prev is not None else 0.0,
+                "boxes": to_yolo(da, CFG.mine.pre_conf),
+            }
+            rec["score"] = (CFG.mine.w_conf * rec["conf"] + CFG.mine.w_disagree * rec["disagree"]
+                            + CFG.mine.w_flicker * rec["flicker"])
+            records.append(rec)
+            prev = da
+        frames.clear(); idxs.clear()
+
+    idx = 0
+    with tqdm(total=total or None, desc=f"Mining {video.name}") as bar:
+        while True:
+            ok, frame = cap.read()
+            if not ok:
+                break
+            if idx % step == 0:
+                frames.append(frame); idxs.append(idx)
+                if len(frames) == batch:
+                    flush()
+            idx += 1
+            bar.update()
+    if frames:
+        flush()
+    cap.release()
+    return records
+
+def select_top_k(records: List[dict], k: int, min_gap: int) -> List[dict]:
+    """Жадно берёт самые информативные кадры, не ближе min_gap кадров к уже выбранным в том же ролике."""
+    chosen: List[dict] = []
+    for rec in sorted(records, key=lambda r: r["score"], reverse=True):
+        if len(chosen) >= k:
+            break
+        if any(c["video"] == rec["video"] and abs(c["frame"] - rec["frame"]) < min_gap for c in chosen):
+            continue
+        chosen.append(rec)
+    return chosen
+
+
+# ─────────────────────────── выгрузка ──────────────────────────────────
+def frame_name(rec: dict) -> str:
+    """
+    <stem>_<хэш каталога>_<кадр>: одноимённые ролики из разных папок
+    (cam1/clip.mp4, cam2/clip.mp4) не затирают кадры и записи CVAT друг друга.
+    """
+    video = Path(rec["video"])
+    tag = hashlib.sha1(str(video.resolve().parent).encode()).hexdigest()[:6]
+    return f"{video.stem}_{tag}_{rec['frame']:06d}{CFG.extract.img_suffix}"
+
+def export(selected: List[dict], out_dir: Path) -> Path:
+    """Сохраняет выбранные кадры, предразметку CVAT XML и оценки (scores.json)."""
+    img_dir = out_dir / "images"
+    img_dir.mkdir(parents=True, exist_ok=True)
+
+    by_video: dict[str, set] = {}
+    for rec in selected:
+        by_video.setdefault(rec["video"], set()).add(rec["frame"])
+    for video, wanted in by_video.items():                         # второй проход: читаем только нужные кадры
+        cap = cv2.VideoCapture(video)
+        idx, last = 0, max(wanted)
+        while idx <= last:
+            ok, frame = cap.read()
+            if not ok:
+                break
+            if idx in wanted:
+                cv2.imwrite(str(img_dir / frame_name({"video": video, "frame": idx})), frame)
+            idx += 1
+        cap.release()
+
+    xml_path = out_dir / "annotations.xml"
+    write_cvat_xml([(frame_name(r), r["width"], r["height"], r["boxes"]) for r in selected], xml_path)
+    with open(out_dir / "scores.json", "w") as f:
+        json.dump([{k: v for k, v in r.items() if k != "boxes"} for r in selected], f, indent=2)
+    return xml_path
+
+def mine(videos: List[Path], weights: Path, second_weights: Optional[Path] = None,
+         out_dir: Path = CFG.paths.mined, top_k: int = CFG.mine.top_k,
+         step: int = CFG.mine.step, min_gap: int = CFG.mine.min_gap) -> Path:
+    from ultralytics import YOLO
+    model = YOLO(str(weights))
+    second = YOLO(str(second_weights)) if second_weights else None
+
+    records: List[dict] = []
+    for video in videos:
+        records.extend(score_video(video, model, second, step))
+    selected = select_top_k(records, top_k, min_gap * step)
+    logger.info(f"Отобрано {len(selected)} из {len(records)} проанализированных кадров "
+                f"(средний score {np.mean([r['score'] for r in selected]) if selected else 0:.3f})")
+    return export(selected, out_dir)
+
+
+if __name__ == "__main__":
+    from src.models.infer_batch import collect_videos
+
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--video", required=True, help="Видео, каталог или glob")
+    ap.add_argument("--weights", type=Path, required=True, help="Текущая лучшая модель")
+    ap.add_argument("--second-weights", type=Path, help="Вторая модель для оценки расхождения (напр. x)")
+    ap.add_argument("--out", type=Path, default=CFG.paths.mined)
+    ap.add_argument("--top-k", type=int, default=CFG.mine.top_k)
+    ap.add_argument("--step", type=int, default=CFG.mine.step)
+    ap.add_argument("--min-gap", type=int, default=CFG.mine.min_gap)
+    args = ap.parse_args()
+
+    vids = collect_videos(args.video)
+    if not vids:
+        raise FileNotFoundError(f"По «{args.video}» не найдено ни одного видео")
+    xml = mine(vids, args.weights, args.second_weights, args.out, args.top_k, args.step, args.min_gap)
+    logger.info(f"Готово: {xml}")
@@ -0,0 +1,151 @@
+# src/data/pseudo_label.py
+
+"""
+pseudo_label.py
+Псевдо-разметка кадров из data/raw/frames, для которых нет ручной разметки
+(их молча пропускает augment.run).
+
+Лучшая модель прогоняется по неразмеченным кадрам большими батчами; результат
+кэшируется по хэшу весов (runs/cache, см. pred_cache.py), поэтому повторный
+запуск с другими порогами модель не вызывает. Остаются боксы выше поклассовых
+порогов; кадры, где есть «сомнительные» боксы (между ambiguous и порогом),
+пропускаются целиком. YOLO-txt пишутся в data/raw/pseudo_labels/ — отдельно от
+ручной разметки, плюс manifest.json с весами и порогами.
+
+Запуск:
+    python -m src.data.pseudo_label --weights runs/exp11_x/weights/best.pt
+Дальше: python -m src.data.augment --pseudo && python -m src.data.split_dataset --pseudo-weight 0.5
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from src.config import CFG
+from src.models.pred_cache import Detections, IMG_EXTS, cached_predictions, dataset_names, file_hash
+from src.utils.logger import get_logger
+from src.utils.metrics import box_iou
+
+logger = get_logger(__name__)
+
+PSEUDO_TAG = "_pseudo"                           # метка в именах файлов после augment
+
+
+def unlabeled_frames(frames_dir: Path = CFG.paths.frames, labels_dir: Path = CFG.paths.labels) -> List[Path]:
+    """Кадры без файла разметки (их пропускает augment.run)."""
+    if not frames_dir.exists():
+        return []
+    return sorted(p for p in frames_dir.iterdir()
+                  if p.suffix.lower() in IMG_EXTS and not (labels_dir / f"{p.stem}.txt").exists())
+
+
+def yolo_lines(boxes: np.ndarray, classes: np.ndarray) -> List[str]:
+    """YOLO-строки «cls xc yc w h» для боксов xyxy в долях кадра."""
+    return [f"{int(c)} {(x0 + x1) / 2:.6f} {(y0 + y1) / 2:.6f} {x1 - x0:.6f} {y1 - y0:.6f}"
+            for (x0, y0, x1, y1), c in zip(boxes, classes)]
+
+
+def pseudo_labels(preds: Detections, thresholds: np.ndarray, ambiguous: float = CFG.pseudo.ambiguous,
+                  gt: Optional[Detections] = None, match_iou: float = 0.5) -> Dict[int, List[str]]:
+    """
+    Псевдо-разметка по предсказаниям: {индекс изображения: YOLO-строки}.
+    Остаются боксы со score ≥ порога своего класса; изображения с «сомнительными»
+    боксами (score в [ambiguous, порог)) в результат не попадают.
+    С *gt* (разметка тех же изображений) боксы, уже покрытые ею (IoU ≥ *match_iou*
+    с любым GT-боксом), отбрасываются — остаются только пропущенные разметчиком.
+    """
+    cls = preds.classes.astype(int)
+    free = np.ones(len(cls), dtype=bool)
+    if gt is not None and len(gt.img) and len(cls):
+        for i in np.unique(preds.img):
+            p, g = np.nonzero(preds.img == i)[0], np.nonzero(gt.img == i)[0]
+            if len(g):
+                free[p] = box_iou(preds.boxes[p], gt.boxes[g]).max(1) < match_iou
+
+    doubtful = free & (preds.scores >= ambiguous) & (preds.scores < thresholds[cls])
+    skip = set(np.unique(preds.img[doubtful]).tolist())
+    confident = free & (preds.scores >= thresholds[cls])
+    return {i: yolo_lines(preds.boxes[confident & (preds.img == i)], cls[confident & (preds.img == i)])
+            for i in range(len(preds.names)) if i not in skip}
+
+
+def class_thresholds(conf: float = CFG.pseudo.conf,
+                     class_conf: Optional[Dict[str, float]] = None) -> np.ndarray:
+    """Массив порогов по id класса: общий *conf*, переопределённый *class_conf* по именам."""
+    names = dataset_names()
+    thr = np.full(len(names), conf, dtype=np.float32)
+    for name, c in (CFG.pseudo.class_conf if class_conf is None else class_conf).items():
+        if name not in names:
+            raise KeyError(f"Неизвестный класс «{name}» в порогах псевдо-разметки")
+        thr[names.index(name)] = c
+    return thr
+
+
+def run(weights: Path, frames: Optional[List[Path]] = None, out_dir: Path = CFG.paths.pseudo_labels,
+        thresholds: Optional[np.ndarray] = None, ambiguous: float = CFG.pseudo.ambiguous,
+        batch: int = CFG.pseudo.batch) -> dict:
+    """
+    Пишет псевдо-разметку для *frames* (по умолч. — все неразмеченные кадры).
+    :returns: manifest (он же out_dir/manifest.json)
+    """
+    frames = unlabeled_frames() if frames is None else frames
+    thr = class_thresholds() if thresholds is None else thresholds
+    logger.info(f"Псевдо-разметка {len(frames)} кадров моделью {weights}")
+    preds = cached_predictions(weights, frames, batch=batch)
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    for old in out_dir.glob("*.txt"):                     # разметка прошлых весов/порогов не должна остаться
+        old.unlink()
+
+    labels = pseudo_labels(preds, thr, ambiguous)
+    skip = len(frames) - len(labels)
+
+    written, boxes = [], 0
+    for i, lines in labels.items():
+        img = frames[i]
+        (out_dir / f"{img.stem}.txt").write_text("\n".join(lines))
+        written.append(img.name)
+        boxes += len(lines)
+
+    manifest = {
+        "weights": str(weights),
+        "weights_hash": file_hash(weights),
+        "thresholds": dict(zip(dataset_names(), map(float, thr))),
+        "ambiguous": ambiguous,
+        "frames": len(frames),
+        "labelled": len(written),
+        "skipped_ambiguous": skip,
+        "boxes": boxes,
+        "files": written,
+    }
+    with open(out_dir / "manifest.json", "w") as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    logger.info(f"Псевдо-разметка: {len(written)} кадров, {boxes} боксов, "
+                f"пропущено сомнительных: {skip} → {out_dir}")
+    return manifest
+
+
+def is_pseudo(path: Path) -> bool:
+    """Файл получен из псевдо-разметки (см. augment.run(include_pseudo=True))."""
+    return PSEUDO_TAG in path.stem
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--weights", type=Path, required=True, help="Модель-учитель (лучшая из имеющихся)")
+    ap.add_argument("--conf", type=float, default=CFG.pseudo.conf, help="Порог для всех классов")
+    ap.add_argument("--class-conf", default="",
+                    help="Поклассовые пороги: knife=0.75,fork=0.7 (дополняют CFG.pseudo.class_conf)")
+    ap.add_argument("--batch", type=int, default=CFG.pseudo.batch)
+    args = ap.parse_args()
+
+    per_class = dict(CFG.pseudo.class_conf)
+    for item in filter(None, args.class_conf.split(",")):
+        name, val = item.split("=")
+        per_class[name.strip()] = float(val)
+    run(args.weights, thresholds=class_thresholds(args.conf, per_class), batch=args.batch)
@@ -4,12 +4,20 @@
 split_dataset.py
 Разбивает полный набор изображений/разметки на train/val/test в пропорции 70/20/10.
 Запуск: python -m src.data.split_dataset
+        python -m src.data.split_dataset --lazy   # исходные кадры → data/dataset_lazy (ссылки, без копий)
+
+Псевдо-размеченные сэмплы (src/data/pseudo_label.py) попадают только в train
+с весом --pseudo-weight: 0 — не брать, 0.5 — случайная половина, 2 — каждый дважды.
+val/test всегда строятся по ручной разметке.
 """
 
 from pathlib import Path
+import argparse
+import os
 import random
 import shutil
 from src.config import CFG
+from src.data.pseudo_label import is_pseudo
 from src.utils.logger import get_logger
 
 logger = get_logger(__name__)
@@ -26,22 +34,88 @@ def split(images: list[Path], train=0.7, val=0.2):
     n_val = int(n * val)
     return images[:n_train], images[n_train:n_train+n_val], images[n_train+n_val:]
 
+def weighted(paths: list[Path], weight: float) -> list[tuple[Path, int]]:
+    """
+    Повторы сэмплов с весом *weight*: каждый берётся int(weight) раз
+    и ещё один раз с вероятностью дробной части. :returns: [(path, номер_повтора)]
+    """
+    out = []
+    for p in paths:
+        reps = int(weight) + (random.random() < weight - int(weight))
+        out.extend((p, k) for k in range(reps))
+    return out
+
+def _dst_name(path: Path, rep: int, suffix: str) -> str:
+    return f"{path.stem}{f'_w{rep}' if rep else ''}{suffix}"
+
 def copy_pairs(pairs: list[Path], dst_img_dir: Path, dst_lbl_dir: Path):
     """
     Копирует изображения вместе с их .txt разметкой.
+    Элемент может быть парой (path, номер_повтора) — см. weighted().
     """
     dst_img_dir.mkdir(parents=True, exist_ok=True)
     dst_lbl_dir.mkdir(parents=True, exist_ok=True)
-    for img_path in pairs:
-        shutil.copy(img_path, dst_img_dir / img_path.name)
+    for item in pairs:
+        img_path, rep = item if isinstance(item, tuple) else (item, 0)
+        shutil.copy(img_path, dst_img_dir / _dst_name(img_path, rep, img_path.suffix))
         lbl = img_path.with_suffix(".txt")
-        shutil.copy(lbl, dst_lbl_dir / lbl.name)
+        shutil.copy(lbl, dst_lbl_dir / _dst_name(lbl, rep, ".txt"))
 
-def run():
-    imgs = list((CFG.paths.data_processed).glob("*.jpg"))
+def link_pairs(pairs: list[Path], labels_dir: Path, dst_img_dir: Path, dst_lbl_dir: Path):
+    """
+    Как copy_pairs, но вместо копий — символические ссылки на исходные кадры
+    и разметку (если ФС не умеет symlink — копируем).
+    """
+    dst_img_dir.mkdir(parents=True, exist_ok=True)
+    dst_lbl_dir.mkdir(parents=True, exist_ok=True)
+    for item in pairs:
+        img_path, rep = item if isinstance(item, tuple) else (item, 0)
+        lbl = labels_dir / (img_path.stem + ".txt")
+        for src, dst in ((img_path, dst_img_dir / _dst_name(img_path, rep, img_path.suffix)),
+                         (lbl, dst_lbl_dir / _dst_name(lbl, rep, ".txt"))):
+            if dst.is_symlink() or dst.exists():
+                dst.unlink()
+            try:
+                os.symlink(src.resolve(), dst)
+            except OSError:
+                shutil.copy(src, dst)
+
+def clear_subset(dst: Path):
+    """Удаляет файлы/ссылки прошлого сплита из dst/images и dst/labels (старые повторы, pseudo, другой seed)."""
+    for d in (dst / "images", dst / "labels"):
+        if d.exists():
+            for old in d.iterdir():
+                old.unlink()
+
+def run_lazy(pseudo_weight: float = CFG.pseudo.weight):
+    """
+    Сплит исходных размеченных кадров (data/raw/frames + data/raw/labels) без
+    аугментированных копий — для обучения с аугментацией на лету (train --lazy-aug).
+    """
+    frames = sorted(CFG.paths.frames.glob("*.jpg"))
+    imgs = [p for p in frames if (CFG.paths.labels / (p.stem + ".txt")).exists()]
+    labelled = set(imgs)
+    pseudo = [p for p in frames if p not in labelled
+              and (CFG.paths.pseudo_labels / (p.stem + ".txt")).exists()]
     tr, vl, ts = split(imgs)
-    logger.info(f"Split: {len(tr)} train, {len(vl)} val, {len(ts)} test")
+    extra = weighted(pseudo, pseudo_weight)
+    logger.info(f"Lazy split: {len(tr)} train (+{len(extra)} pseudo), {len(vl)} val, {len(ts)} test "
+                f"→ {CFG.paths.dataset_lazy}")
     for subset, paths in zip(("train", "val", "test"), (tr, vl, ts)):
+        dst = CFG.paths.dataset_lazy / subset
+        clear_subset(dst)
+        link_pairs(paths, CFG.paths.labels, dst / "images", dst / "labels")
+    link_pairs(extra, CFG.paths.pseudo_labels,
+               CFG.paths.dataset_lazy / "train" / "images", CFG.paths.dataset_lazy / "train" / "labels")
+
+def run(pseudo_weight: float = CFG.pseudo.weight):
+    imgs = list((CFG.paths.data_processed).glob("*.jpg"))
+    pseudo = [p for p in imgs if is_pseudo(p)]
+    tr, vl, ts = split([p for p in imgs if not is_pseudo(p)])
+    extra = weighted(pseudo, pseudo_weight)
+    logger.info(f"Split: {len(tr)} train (+{len(extra)} pseudo), {len(vl)} val, {len(ts)} test")
+    for subset, paths in zip(("train", "val", "test"), (tr + extra, vl, ts)):
+        clear_subset(CFG.paths.dataset / subset)
         copy_pairs(
             paths,
             CFG.paths.dataset / subset / "images",
@@ -49,4 +123,13 @@ def run():
         )
 
 if __name__ == "__main__":
-    run()
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--lazy", action="store_true",
+                    help="сплит исходных кадров ссылками в data/dataset_lazy (для train --lazy-aug)")
+    ap.add_argument("--pseudo-weight", type=float, default=CFG.pseudo.weight,
+                    help="вес псевдо-размеченных сэмплов в train (0 — не брать)")
+    args = ap.parse_args()
+    if args.lazy:
+        run_lazy(args.pseudo_weight)
+    else:
+        run(args.pseudo_weight)
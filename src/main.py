@@ -13,6 +13,18 @@ main.py
 
     # инференс «по-короткому» (возьмёт последнее video.* и последний best.pt)
     python -m src.main infer
+
+    # пакетный инференс каталога / glob-а пулом из 4 воркеров
+    python -m src.main infer --video "data/raw/night/*.mp4" --workers 4
+
+    # выбор модели для деплоя: самая точная в бюджете 40 мс/кадр на CPU
+    python -m src.main select --budget 40 --export onnx,openvino
+
+    # живой поток: RTSP-камера → детекции в JSON Lines
+    python -m src.main stream --source rtsp://10.0.0.5/stream1 --out results/line1.jsonl
+
+    # отбор «трудных» кадров из нового видео для разметки в CVAT
+    python -m src.main mine --video data/raw/new_clip.mp4 --second-weights runs/exp11_x/weights/best.pt
 """
 
 from __future__ import annotations
@@ -25,14 +37,20 @@ from typing import List, Optional
 
 from src.config import CFG
 from src.utils.logger import get_logger
+from src.utils.video import BACKENDS
 
 # ─── единичные этапы ──────────────────────────────────────────────────── #
 from src.data.extract_frames import extract
 from src.data.augment import run as augment_run
+from src.data.mine_frames import mine
+from src.data.pseudo_label import class_thresholds, run as pseudo_run
 from src.data.split_dataset import run as split_run
 from src.models.train import main as train_main
 from src.models.evaluate import main as eval_main
-from src.models.infer_video import main as infer_video_main
+from src.models.infer_video import main as infer_video_main, roi_from_args
+from src.models.infer_batch import collect_videos, run_batch
+from src.models.select_model import select, selected_weights
+from src.models.stream import main as stream_main
 from src.report.make_report import main as report_main
 
 logger = get_logger(__name__)
@@ -67,7 +85,11 @@ def _default_video() -> Path:
     return vid
 
 
-def _default_weights() -> Path:
+def _default_weights(prefer_selected: bool = False) -> Path:
+    """Самый свежий best.pt; для деплоя (*prefer_selected*) — модель из runs/selected.json, если есть."""
+    if prefer_selected and (w := selected_weights()):
+        logger.info(f"Веса из {CFG.paths.selected.name}: {w}")
+        return w
     w = _most_recent([str(CFG.paths.runs / "**/best.pt")])
     if not w:
         raise FileNotFoundError("Не найдено ни одного best.pt в папке runs/")
@@ -87,6 +109,11 @@ def _build_parser() -> argparse.ArgumentParser:
     tr = sub.add_parser("train", help="обучить модель (n/s/x)")
     tr.add_argument("--size", default=CFG.train.model_size, choices=("n", "s", "x"))
     tr.add_argument("--epochs", type=int, default=CFG.train.epochs)
+    tr.add_argument("--img", type=int, default=CFG.train.img_size)
+    tr.add_argument("--batch", type=int, default=CFG.train.batch)
+    tr.add_argument("--device", default=CFG.train.device, help="GPU id или cpu")
+    tr.add_argument("--lazy-aug", action="store_true",
+                    help="аугментация на лету по data/dataset_lazy (см. split_dataset --lazy)")
 
     # оценка
     ev = sub.add_parser("eval", help="оценить веса")
@@ -94,13 +121,69 @@ def _build_parser() -> argparse.ArgumentParser:
 
     # инференс (все аргументы -> опциональны)
     inf = sub.add_parser("infer", help="инференс нового видео")
-    inf.add_argument("--video", type=Path, help="видео (по умолч. — последнее в data/raw)")
-    inf.add_argument("--weights", type=Path, help="веса (по умолч. — самый свежий best.pt)")
-    inf.add_argument("--out", type=Path, help="файл вывода (.mp4). "
+    inf.add_argument("--video", help="видео, каталог или glob (по умолч. — последнее в data/raw)")
+    inf.add_argument("--weights", type=Path,
+                     help="веса (по умолч. — выбранные командой select, иначе самый свежий best.pt)")
+    inf.add_argument("--out", type=Path, help="файл вывода (.mp4), для каталога/glob — папка. "
                      "Если не указан — results/<video>_boxes.mp4")
-    inf.add_argument("--img", type=int, default=640)
-    inf.add_argument("--conf", type=float, default=0.25)
-    inf.add_argument("--batch", type=int, default=16)
+    inf.add_argument("--img", type=int, default=CFG.infer.img_size)
+    inf.add_argument("--conf", type=float, default=CFG.infer.conf)
+    inf.add_argument("--batch", type=int, default=CFG.infer.batch)
+    inf.add_argument("--device", default=CFG.infer.device, help="cpu | 0 | … (пусто — авто)")
+    inf.add_argument("--writer", default=CFG.video.backend, choices=BACKENDS,
+                     help="бэкенд записи видео: ffmpeg | opencv | auto")
+    inf.add_argument("--codec", default=CFG.video.codec)
+    inf.add_argument("--preset", default=CFG.video.preset)
+    inf.add_argument("--crf", type=int, default=CFG.video.crf)
+    inf.add_argument("--scale", type=int, help="высота выходного видео (только ffmpeg)")
+    inf.add_argument("--queue", type=int, default=CFG.video.queue,
+                     help="длина очереди асинхронной записи, 0 — синхронно")
+    inf.add_argument("--workers", type=int, default=CFG.infer.workers,
+                     help="число процессов для каталога/glob (подбирать бенчмарком infer_batch)")
+    inf.add_argument("--threads", type=int, default=CFG.infer.threads,
+                     help="torch-потоков на воркер, 0 — cpu_count // workers")
+    inf.add_argument("--force", action="store_true",
+                     help="пересчитать ролики, даже если результат актуален")
+    inf.add_argument("--camera", help="имя камеры из CFG.roi — инференс только по её ROI")
+    inf.add_argument("--roi", help="ROI-прямоугольник x0,y0,x1,y1 (0-1), перекрывает --camera")
+
+    # потоковый инференс
+    st = sub.add_parser("stream", help="инференс живого потока (камера, RTSP, FIFO, файл по кругу)")
+    st.add_argument("--source", required=True, help="индекс камеры, RTSP/HTTP URL, файл или FIFO")
+    st.add_argument("--weights", type=Path,
+                    help="веса (по умолч. — выбранные командой select, иначе самый свежий best.pt)")
+    st.add_argument("--out", default="-", help="файл JSON Lines для детекций, «-» — stdout")
+    st.add_argument("--img", type=int, default=CFG.infer.img_size)
+    st.add_argument("--conf", type=float, default=CFG.infer.conf)
+    st.add_argument("--device", default=CFG.infer.device)
+    st.add_argument("--loop", action="store_true", default=CFG.stream.loop,
+                    help="файл-источник воспроизводить по кругу")
+    st.add_argument("--duration", type=float, default=0.0, help="остановиться через N секунд")
+    st.add_argument("--stats", type=Path, help="куда сохранить p50/p95 задержки и drop-rate (.json)")
+    st.add_argument("--camera", help="имя камеры из CFG.roi")
+    st.add_argument("--roi", help="ROI-прямоугольник x0,y0,x1,y1 (0-1)")
+
+    # hard-example mining
+    mn = sub.add_parser("mine", help="отобрать неуверенные кадры из нового видео → CVAT XML")
+    mn.add_argument("--video", required=True, help="видео, каталог или glob")
+    mn.add_argument("--weights", type=Path, help="веса (по умолч. — самый свежий best.pt)")
+    mn.add_argument("--second-weights", type=Path, help="вторая модель для оценки расхождения (напр. x)")
+    mn.add_argument("--out", type=Path, default=CFG.paths.mined)
+    mn.add_argument("--top-k", type=int, default=CFG.mine.top_k)
+    mn.add_argument("--step", type=int, default=CFG.mine.step)
+
+    # псевдо-разметка
+    ps = sub.add_parser("pseudo", help="псевдо-разметка неразмеченных кадров data/raw/frames")
+    ps.add_argument("--weights", type=Path, help="веса (по умолч. — самый свежий best.pt)")
+    ps.add_argument("--conf", type=float, default=CFG.pseudo.conf)
+
+    # выбор модели для деплоя
+    sel = sub.add_parser("select", help="выбрать модель по CPU-латентности и val mAP → runs/selected.json")
+    sel.add_argument("--budget", type=float, default=CFG.select.budget_ms, help="бюджет, мс/кадр")
+    sel.add_argument("--img", type=int, default=CFG.select.img_size)
+    sel.add_argument("--batch", type=int, default=CFG.select.batch)
+    sel.add_argument("--export", type=lambda s: [x for x in s.split(",") if x],
+                     help="экспортировать недостающие варианты: onnx,openvino,torchscript")
 
     # отчёт
     sub.add_parser("report", help="собрать Markdown-отчёт")
@@ -122,8 +205,10 @@ def _run_all(video: Path) -> None:
     for sz in ("n", "s", "x"):
         _dispatch(train_main, ["--size", sz, "--epochs", str(CFG.train.epochs)])
 
+    # метрики — по кэшу предсказаний: модель прогоняется по val один раз на файл весов,
+    # повторные eval/report/select берут готовые предсказания
     for best in CFG.paths.runs.rglob("best.pt"):
-        _dispatch(eval_main, ["--weights", str(best)])
+        _dispatch(eval_main, ["--weights", str(best), "--cached"])
 
     report_main()
 
@@ -136,15 +221,36 @@ def main() -> None:
         _run_all(args.video)
 
     elif args.cmd == "train":
-        _dispatch(train_main, ["--size", args.size, "--epochs", str(args.epochs)])
+        _dispatch(train_main, ["--size", args.size, "--epochs", str(args.epochs),
+                               "--img", str(args.img), "--batch", str(args.batch),
+                               "--device", args.device,
+                               *(["--lazy-aug"] if args.lazy_aug else [])])
 
     elif args.cmd == "eval":
         _dispatch(eval_main, ["--weights", str(args.weights)])
 
     elif args.cmd == "infer":
         # ——— 1. подставляем значения по умолчанию ——————————————— #
-        video: Path = args.video or _default_video()
-        weights: Path = args.weights or _default_weights()
+        weights: Path = args.weights or _default_weights(prefer_selected=True)
+        videos = collect_videos(args.video) if args.video else [_default_video()]
+        if not videos:
+            raise FileNotFoundError(f"По «{args.video}» не найдено ни одного видео")
+
+        # ——— каталог / glob → пакетный режим ——————————————————— #
+        if args.video and not Path(args.video).is_file():
+            run_batch(
+                videos, weights, args.out or Path("results"),
+                img=args.img, conf=args.conf, batch=args.batch, workers=args.workers,
+                writer_opts=dict(backend=args.writer, codec=args.codec, preset=args.preset,
+                                 crf=args.crf, scale=args.scale, queue_size=args.queue),
+                force=args.force,
+                roi=roi_from_args(args),
+                threads=args.threads,
+                device=args.device,
+            )
+            return
+
+        video: Path = videos[0]
         out: Path = args.out or Path(f"results/{video.stem}_boxes.mp4")
 
         logger.info("⚙️  Параметры инференса:"
@@ -153,7 +259,8 @@ def main() -> None:
                     f"\n   out     = {out}"
                     f"\n   img     = {args.img}"
                     f"\n   conf    = {args.conf}"
-                    f"\n   batch   = {args.batch}")
+                    f"\n   batch   = {args.batch}"
+                    f"\n   writer  = {args.writer} ({args.codec}, preset={args.preset}, crf={args.crf})")
 
         out.parent.mkdir(parents=True, exist_ok=True)
 
@@ -166,9 +273,50 @@ def main() -> None:
                 "--img", str(args.img),
                 "--conf", str(args.conf),
                 "--batch", str(args.batch),
+                "--device", args.device,
+                "--writer", args.writer,
+                "--codec", args.codec,
+                "--preset", args.preset,
+                "--crf", str(args.crf),
+                "--queue", str(args.queue),
+                *(["--scale", str(args.scale)] if args.scale else []),
+                *(["--camera", args.camera] if args.camera else []),
+                *(["--roi", args.roi] if args.roi else []),
+            ],
+        )
+
+    elif args.cmd == "stream":
+        _dispatch(
+            stream_main,
+            [
+                "--source", args.source,
+                "--weights", str(args.weights or _default_weights(prefer_selected=True)),
+                "--out", args.out,
+                "--img", str(args.img),
+                "--conf", str(args.conf),
+                "--device", args.device,
+                "--loop" if args.loop else "--no-loop",
+                "--duration", str(args.duration),
+                *(["--stats", str(args.stats)] if args.stats else []),
+                *(["--camera", args.camera] if args.camera else []),
+                *(["--roi", args.roi] if args.roi else []),
             ],
         )
 
+    elif args.cmd == "mine":
+        videos = collect_videos(args.video)
+        if not videos:
+            raise FileNotFoundError(f"По «{args.video}» не найдено ни одного видео")
+        xml = mine(videos, args.weights or _default_weights(), args.second_weights,
+                   args.out, args.top_k, args.step)
+        logger.info(f"📝 Предразметка для CVAT → {xml}")
+
+    elif args.cmd == "pseudo":
+        pseudo_run(args.weights or _default_weights(), thresholds=class_thresholds(args.conf))
+
+    elif args.cmd == "select":
+        select(args.budget, args.img, args.batch, args.export)
+
     elif args.cmd == "report":
         report_main()
 
@@ -0,0 +1,136 @@
+# src/models/distill.py
+"""
+Дистилляция teacher → student (yolo11x → yolo11n/s) через кэш предсказаний учителя.
+
+Предсказания учителя по train-сплиту и неразмеченным кадрам считаются один раз
+и хранятся в runs/cache/*.npz (см. pred_cache.py, ключ — хэш весов). Из них
+собирается датасет data/dataset_distill:
+    • размеченные train-кадры — исходная разметка + уверенные боксы учителя,
+                                которых в ней нет (IoU < CFG.distill.missed_iou);
+    • неразмеченные кадры     — псевдо-разметка учителя;
+    • val/test                — ссылки на исходные сплиты, чтобы mAP был сравним.
+Пороги по классам и пропуск «сомнительных» кадров — общие с pseudo_label.py
+(CFG.pseudo), чтобы два пути псевдо-разметки не расходились.
+
+Ultralytics обучает детектор только на «жёстких» боксах, поэтому soft-targets
+учителя используются в виде отфильтрованных по confidence псевдо-меток.
+
+Запуск — через train.py:
+    python -m src.models.train --size n --distill-from runs/exp11_x/weights/best.pt
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import shutil
+from pathlib import Path
+from typing import List, Optional
+
+import numpy as np
+import yaml
+
+from src.config import CFG
+from src.data.pseudo_label import class_thresholds, pseudo_labels, unlabeled_frames
+from src.models.pred_cache import (DATASET_YAML, cached_predictions, dataset_images, dataset_names,
+                                   label_path, load_ground_truth)
+from src.utils.logger import get_logger
+
+log = get_logger(__name__)
+
+
+def _link(src: Path, dst: Path) -> None:
+    if dst.is_symlink() or dst.is_file():
+        dst.unlink()
+    elif dst.is_dir():
+        shutil.rmtree(dst)
+    try:
+        os.symlink(src.resolve(), dst, target_is_directory=src.is_dir())
+    except OSError:
+        (shutil.copytree if src.is_dir() else shutil.copy)(src, dst)
+
+
+def build_distill_dataset(teacher: Path, thresholds: Optional[np.ndarray] = None,
+                          unlabeled: Optional[List[Path]] = None,
+                          out: Path = CFG.paths.dataset_distill) -> Path:
+    """
+    Собирает датасет для обучения ученика и возвращает путь к его yaml.
+    :param thresholds: поклассовые пороги (по умолч. — class_thresholds(), как у pseudo_label)
+    :param unlabeled: кадры без разметки (по умолч. — все неразмеченные из data/raw/frames)
+    """
+    thr = class_thresholds() if thresholds is None else thresholds
+    train = dataset_images("train")
+    extra = unlabeled_frames() if unlabeled is None else unlabeled
+    train_preds = cached_predictions(teacher, train)
+    extra_preds = cached_predictions(teacher, extra)
+
+    img_dir, lbl_dir = out / "train" / "images", out / "train" / "labels"
+    for d in (img_dir, lbl_dir):
+        if d.exists():
+            shutil.rmtree(d)
+        d.mkdir(parents=True)
+
+    # размеченные кадры: исходная разметка + уверенные боксы учителя, которых в ней нет
+    gt = load_ground_truth(train, train_preds.shapes)
+    missed = pseudo_labels(train_preds, thr, CFG.pseudo.ambiguous, gt=gt, match_iou=CFG.distill.missed_iou)
+    added = 0
+    for i, img in enumerate(train):
+        _link(img, img_dir / img.name)
+        lbl = label_path(img)
+        extra_lines = missed.get(i, [])
+        if not extra_lines:
+            if lbl.exists():
+                _link(lbl, lbl_dir / f"{img.stem}.txt")
+            continue
+        own = lbl.read_text().strip().splitlines() if lbl.exists() else []
+        (lbl_dir / f"{img.stem}.txt").write_text("\n".join(own + extra_lines))
+        added += len(extra_lines)
+
+    # неразмеченные кадры: та же псевдо-разметка, что и у pseudo_label.run
+    pseudo = pseudo_labels(extra_preds, thr, CFG.pseudo.ambiguous)
+    boxes = 0
+    for i, lines in pseudo.items():
+        img = extra[i]
+        _link(img, img_dir / img.name)
+        (lbl_dir / f"{img.stem}.txt").write_text("\n".join(lines))
+        boxes += len(lines)
+
+    with open(DATASET_YAML) as f:
+        base = yaml.safe_load(f)
+    for split in ("val", "test"):
+        _link((DATASET_YAML.parent / base[split]).resolve().parent, out / split)
+
+    data_yaml = out / "dataset.yaml"
+    with open(data_yaml, "w") as f:
+        yaml.safe_dump({"path": str(out), "train": "train/images", "val": "val/images",
+                        "test": "test/images", "nc": len(dataset_names()), "names": dataset_names()},
+                       f, allow_unicode=True)
+    log.info(f"Distill-датасет: {len(train)} размеченных (+{added} пропущенных разметкой боксов учителя), "
+             f"{len(pseudo)} из {len(extra)} неразмеченных кадров с {boxes} боксами "
+             f"(сомнительные пропущены) → {out}")
+    return data_yaml
+
+
+def record_result(run_dir: Path, teacher: Path, size: str, summary: dict, imgsz: int) -> dict:
+    """Пишет runs/<exp>/distill.json: mAP ученика против его CPU-латентности (и учителя)."""
+    from src.utils.bench import measure_latency
+
+    entry = {
+        "teacher": str(teacher),
+        "student": f"yolo11{size}",
+        "imgsz": imgsz,
+        "mAP50": summary.get("mAP50"),
+        "mAP50-95": summary.get("mAP50-95"),
+        "latency_ms_cpu": measure_latency(run_dir / "weights" / "best.pt", imgsz),
+        "teacher_latency_ms_cpu": measure_latency(teacher, imgsz),
+    }
+    teacher_metrics = teacher.with_suffix(".metrics.json")
+    if teacher_metrics.exists():
+        with open(teacher_metrics) as f:
+            t = json.load(f)
+        entry["teacher_mAP50"], entry["teacher_mAP50-95"] = t.get("mAP50"), t.get("mAP50-95")
+
+    with open(run_dir / "distill.json", "w") as f:
+        json.dump(entry, f, indent=4)
+    log.info(f"Дистилляция: {entry}")
+    return entry
@@ -5,15 +5,21 @@ evaluate.py
 Запуск:
     python -m src.models.evaluate --weights /path/to/model.pt
 Если --weights не указан → берётся самый новый runs/**/weights/best.pt
+
+Быстрый режим по кэшу предсказаний (model.val не вызывается, см. pred_cache.py):
+    python -m src.models.evaluate --weights runs/exp11_s/weights/best.pt --cached \
+        [--conf 0.25] [--iou 0.5] [--sweep 0.1,0.25,0.4,0.55] [--plot-pr]
 """
 
 from __future__ import annotations
-import argparse, glob
+import argparse, glob, json
 from pathlib import Path
 from datetime import datetime
 
 from ultralytics import YOLO
-from src.utils.metrics import summarise_metrics
+from src.models.pred_cache import cached_predictions, dataset_images, dataset_names, load_ground_truth
+from src.utils.metrics import (conf_sweep, detection_metrics, per_class_metrics, size_breakdown,
+                               summarise_metrics)
 from src.config import CFG
 from src.utils.logger import get_logger
 
@@ -36,9 +42,76 @@ def newest_best() -> Path | None:
 def parse_args() -> argparse.Namespace:
     p = argparse.ArgumentParser()
     p.add_argument("--weights", type=Path, help=".pt файл с весами")
+    p.add_argument("--cached", action="store_true",
+                   help="метрики по кэшу предсказаний (NumPy) вместо model.val")
+    p.add_argument("--conf", type=float, default=0.001, help="порог confidence (режим --cached)")
+    p.add_argument("--iou", type=float, help="порог NMS IoU, строже 0.7 (режим --cached)")
+    p.add_argument("--sweep", type=lambda s: [float(x) for x in s.split(",")],
+                   help="список порогов conf для перебора, напр. 0.1,0.25,0.5 (включает --cached)")
+    p.add_argument("--plot-pr", action="store_true", help="сохранить PR-кривую рядом с весами")
     return p.parse_args()
 
 
+def _plot_pr(raw: dict, names: list[str], out: Path) -> None:
+    import matplotlib.pyplot as plt
+    fig = plt.figure()
+    for k, c in enumerate(raw["classes"]):
+        plt.plot(raw["px"], raw["pr_curve"][k], lw=1, label=f"{names[c]} {raw['ap'][k, 0]:.3f}")
+    if len(raw["classes"]):
+        plt.plot(raw["px"], raw["pr_curve"].mean(0), lw=2, c="k", label=f"all {raw['ap'][:, 0].mean():.3f}")
+    plt.xlabel("Recall"); plt.ylabel("Precision"); plt.xlim(0, 1); plt.ylim(0, 1.01)
+    plt.title("PR @ IoU 0.5"); plt.legend(fontsize=7)
+    fig.savefig(out); plt.close(fig)
+    log.info(f"PR-кривая → {out}")
+
+
+def cached_eval(weights: Path, conf: float, iou: float | None, sweep: list[float] | None,
+                plot_pr: bool) -> dict:
+    """Метрики по кэшу предсказаний на val-сплите: без повторного прогона модели."""
+    images = dataset_images("val")
+    preds = cached_predictions(weights, images)
+    gts = load_ground_truth(images, preds.shapes)
+    names = dataset_names()
+    arrays = (*preds.arrays(), gts.img, gts.boxes, gts.classes)
+
+    summary = detection_metrics(*arrays, nc=len(names), conf=conf, iou=iou, n_images=len(images))
+    raw = summary.pop("_raw")
+    summary["per_class"] = per_class_metrics(raw["classes"], raw["ap"], raw["p"], raw["r"], names)
+    summary["sizes"] = size_breakdown(*arrays, preds.shapes, nc=len(names), conf=conf)
+    if plot_pr:
+        _plot_pr(raw, names, weights.with_suffix(".pr.png"))
+
+    if sweep:
+        rows = conf_sweep(*arrays, nc=len(names), confs=sweep, iou=iou, n_images=len(images))
+        head = f"{'conf':>6} {'mAP50':>7} {'mAP50-95':>9} {'P':>7} {'R':>7} {'F1':>7} {'dets':>6}"
+        lines = [f"{r['conf']:>6} {r['mAP50']:>7} {r['mAP50-95']:>9} {r['precision']:>7} "
+                 f"{r['recall']:>7} {r['f1']:>7} {r['detections']:>6}" for r in rows]
+        log.info("Перебор порогов conf:\n" + "\n".join([head, *lines]))
+        summary["sweep"] = rows
+    return summary
+
+
+def size_metrics(weights: Path) -> dict:
+    """
+    small/medium/large на val по кэшу предсказаний; если кэша ещё нет, он
+    заполняется здесь — следующие eval/report/--cached модель уже не запускают.
+    """
+    images = dataset_images("val")
+    preds = cached_predictions(weights, images)
+    gts = load_ground_truth(images, preds.shapes)
+    return size_breakdown(*preds.arrays(), gts.img, gts.boxes, gts.classes, preds.shapes,
+                          nc=len(dataset_names()))
+
+
+def save_summary(summary: dict, weights: Path) -> Path:
+    """Сохраняет метрики рядом с весами: runs/<exp>/weights/best.metrics.json."""
+    out = weights.with_suffix(".metrics.json")
+    with open(out, "w") as f:
+        json.dump(summary, f, indent=4, ensure_ascii=False)
+    log.info(f"Метрики → {out}")
+    return out
+
+
 def main() -> None:
     args = parse_args()
 
@@ -46,6 +119,13 @@ def main() -> None:
     if not weights or not weights.exists():
         raise FileNotFoundError("Не удалось определить файл весов; передайте его через --weights")
 
+    if args.cached or args.sweep:
+        summary = cached_eval(weights, args.conf, args.iou, args.sweep, args.plot_pr)
+        log.info(f"⭐ Результаты (кэш):\n{summary}")
+        if args.conf == 0.001 and args.iou is None:        # сохраняем только «валидационную» точку
+            save_summary({k: v for k, v in summary.items() if k != "sweep"}, weights)
+        return
+
     model = YOLO(str(weights))
     metrics = model.val(
         data=str(Path(__file__).parent / "dataset.yaml"),
@@ -55,7 +135,9 @@ def main() -> None:
         verbose=True,
     )
     summary = summarise_metrics(metrics)
+    summary["sizes"] = size_metrics(weights)
     log.info(f"⭐ Результаты:\n{summary}")
+    save_summary(summary, weights)
 
 
 if __name__ == "__main__":
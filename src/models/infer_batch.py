@@ -0,0 +1,247 @@
+# src/models/infer_batch.py
+"""
+Пакетный инференс: каталог или glob с роликами → пул воркеров.
+
+• по одному экземпляру модели на воркер (загружается в initializer);
+• для .pt-весов (torch) intra-op потоки делятся поровну между воркерами
+  (или задаются явно — CFG.infer.threads / профиль хоста);
+• ролики, у которых результат свежее и видео, и весов, пропускаются;
+• в <out>/summary.json пишется сводка с frames/sec по каждому ролику,
+  в <out>/config.yaml — итоговая конфигурация запуска.
+
+Пример:
+    python -m src.models.infer_batch \
+        --videos "data/raw/night/*.mp4" \
+        --weights runs/exp11_s/weights/best.pt \
+        --out results/night --workers 4 --batch 8
+
+Подбор числа воркеров и batch-size на конкретной машине:
+    python -m src.models.infer_batch --videos data/raw/night \
+        --weights runs/exp11_s/weights/best.pt \
+        --bench-workers 1,2,4 --bench-batch 4,8,16
+"""
+
+from __future__ import annotations
+
+import argparse
+import glob
+import json
+import multiprocessing as mp
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import List, Optional
+
+from src.config import CFG, dump_config
+from src.data.extract_frames import VIDEO_EXTS
+from src.utils.logger import get_logger
+from src.utils.roi import ROI
+from src.utils.video import BACKENDS
+
+log = get_logger(__name__)
+
+_MODEL = None  # модель текущего воркера (см. _init_worker)
+
+
+# ───────────────────── поиск роликов ──────────────────────
+def collect_videos(spec: str | Path) -> List[Path]:
+    """
+    Разворачивает *spec* в список роликов:
+    каталог → все файлы с расширением из VIDEO_EXTS, glob → совпадения, файл → [файл].
+    """
+    spec = str(spec)
+    path = Path(spec)
+    if path.is_dir():
+        hits = [p for p in path.iterdir() if p.suffix.lower() in VIDEO_EXTS]
+    elif glob.has_magic(spec):
+        hits = [Path(p) for p in glob.glob(spec, recursive=True)]
+    elif path.exists():
+        hits = [path]
+    else:
+        hits = []
+    return sorted(p for p in hits if p.is_file())
+
+
+def output_for(video: Path, out_dir: Path) -> Path:
+    return out_dir / f"{video.stem}_boxes.mp4"
+
+
+def is_up_to_date(out: Path, video: Path, weights: Path) -> bool:
+    """Результат существует и новее как ролика, так и весов."""
+    if not out.exists():
+        return False
+    return out.stat().st_mtime >= max(video.stat().st_mtime, weights.stat().st_mtime)
+
+
+# ───────────────────── воркеры ─────────────────────────────
+def _init_worker(weights: str, threads: int) -> None:
+    """Initializer пула: одна модель на процесс, ограничение потоков torch."""
+    global _MODEL
+    if weights.endswith(".pt"):
+        import torch
+        torch.set_num_threads(threads)
+    from ultralytics import YOLO
+    _MODEL = YOLO(weights)
+
+
+def _work(video: str, out: str, img: int, conf: float, batch: int, writer_opts: dict,
+          roi: Optional[ROI] = None, device: str = "") -> dict:
+    from src.models.infer_video import infer
+    try:
+        return infer(_MODEL, Path(video), Path(out), img, conf, batch, writer_opts, progress=False,
+                     roi=roi, device=device)
+    except Exception as e:                                 # один битый ролик не должен ронять весь пакет
+        return {"video": video, "out": out, "error": repr(e)}
+
+
+# ───────────────────── основной API ────────────────────────
+def run_batch(
+    videos: List[Path],
+    weights: Path,
+    out_dir: Path,
+    img: int = CFG.infer.img_size,
+    conf: float = CFG.infer.conf,
+    batch: int = CFG.infer.batch,
+    workers: int = CFG.infer.workers,
+    writer_opts: Optional[dict] = None,
+    force: bool = False,
+    roi: Optional[ROI] = None,
+    threads: int = CFG.infer.threads,
+    device: str = CFG.infer.device,
+) -> dict:
+    """
+    Обрабатывает *videos* пулом из *workers* процессов.
+    :returns: сводка (она же пишется в out_dir/summary.json)
+    """
+    out_dir.mkdir(parents=True, exist_ok=True)
+    jobs, skipped = [], []
+    for v in videos:
+        out = output_for(v, out_dir)
+        if not force and is_up_to_date(out, v, weights):
+            skipped.append(str(v))
+            continue
+        jobs.append((str(v), str(out)))
+
+    workers = max(1, min(workers, len(jobs) or 1))
+    threads = threads or max(1, (os.cpu_count() or 1) // workers)
+    dump_config(out_dir, {"infer": dict(img_size=img, conf=conf, batch=batch, workers=workers,
+                                        threads=threads, device=device)})
+    log.info(f"▶️  {len(jobs)} роликов (пропущено актуальных: {len(skipped)}), "
+             f"workers={workers}, threads/worker={threads}, batch={batch}")
+
+    results: list[dict] = []
+    t0 = time.perf_counter()
+    if jobs and workers == 1:
+        _init_worker(str(weights), threads)
+        for v, out in jobs:
+            results.append(_work(v, out, img, conf, batch, writer_opts or {}, roi, device))
+            log.info(f"  {Path(v).name}: {results[-1].get('fps', 'ошибка')} fps")
+    elif jobs:
+        # spawn: CUDA и многопоточные BLAS плохо переживают fork
+        with ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context("spawn"),
+                                 initializer=_init_worker, initargs=(str(weights), threads)) as pool:
+            futures = [pool.submit(_work, v, out, img, conf, batch, writer_opts or {}, roi, device)
+                       for v, out in jobs]
+            for fut in as_completed(futures):
+                results.append(fut.result())
+                log.info(f"  {Path(results[-1]['video']).name}: {results[-1].get('fps', 'ошибка')} fps")
+    wall = time.perf_counter() - t0
+
+    frames = sum(r.get("frames", 0) for r in results)
+    summary = {
+        "weights": str(weights),
+        "img": img,
+        "conf": conf,
+        "batch": batch,
+        "workers": workers,
+        "threads_per_worker": threads,
+        "device": device,
+        "roi": (roi.rect or roi.polygon) if roi is not None else None,
+        "videos": sorted(results, key=lambda r: r["video"]),
+        "skipped": skipped,
+        "errors": sum("error" in r for r in results),
+        "total_frames": frames,
+        "wall_seconds": round(wall, 3),
+        "fps": round(frames / wall, 2) if wall > 0 and frames else 0.0,
+    }
+    with open(out_dir / "summary.json", "w") as f:
+        json.dump(summary, f, indent=4, ensure_ascii=False)
+    log.info(f"✅ {frames} кадров за {wall:.1f} с ({summary['fps']} fps) → {out_dir / 'summary.json'}")
+    return summary
+
+
+def benchmark(videos: List[Path], weights: Path, workers_list: List[int], batch_list: List[int],
+              img: int = CFG.infer.img_size, conf: float = CFG.infer.conf,
+              writer_opts: Optional[dict] = None, roi: Optional[ROI] = None,
+              device: str = CFG.infer.device) -> List[dict]:
+    """
+    Перебирает сетку (workers × batch) на одних и тех же роликах и
+    возвращает суммарный fps каждой комбинации (по убыванию).
+    """
+    rows = []
+    for workers in workers_list:
+        for batch in batch_list:
+            with tempfile.TemporaryDirectory() as tmp:
+                s = run_batch(videos, weights, Path(tmp), img, conf, batch, workers, writer_opts,
+                              force=True, roi=roi, device=device)
+            rows.append({"workers": workers, "batch": batch, "fps": s["fps"], "wall_seconds": s["wall_seconds"]})
+    rows.sort(key=lambda r: r["fps"], reverse=True)
+    for r in rows:
+        log.info(f"  workers={r['workers']:<2} batch={r['batch']:<3} → {r['fps']} fps")
+    return rows
+
+
+# ───────────────────── CLI ─────────────────────────────────
+def _int_list(s: str) -> List[int]:
+    return [int(x) for x in s.split(",") if x.strip()]
+
+
+def parse_args() -> argparse.Namespace:
+    p = argparse.ArgumentParser()
+    p.add_argument("--videos", required=True, help="Каталог, glob или файл")
+    p.add_argument("--weights", type=Path, required=True, help="Файл весов")
+    p.add_argument("--out", type=Path, default=Path("results"), help="Каталог для результатов")
+    p.add_argument("--img", type=int, default=CFG.infer.img_size)
+    p.add_argument("--conf", type=float, default=CFG.infer.conf)
+    p.add_argument("--batch", type=int, default=CFG.infer.batch)
+    p.add_argument("--workers", type=int, default=CFG.infer.workers, help="Число процессов-воркеров")
+    p.add_argument("--threads", type=int, default=CFG.infer.threads,
+                   help="torch-потоков на воркер, 0 — cpu_count // workers")
+    p.add_argument("--device", default=CFG.infer.device, help="cpu | 0 | … (пусто — авто)")
+    p.add_argument("--force", action="store_true", help="Пересчитать даже актуальные результаты")
+    p.add_argument("--writer", default=CFG.video.backend, choices=BACKENDS)
+    p.add_argument("--camera", help="Имя камеры из CFG.roi")
+    p.add_argument("--roi", help="ROI-прямоугольник x0,y0,x1,y1 (0-1)")
+    p.add_argument("--bench-workers", type=_int_list, help="Сетка числа воркеров для бенчмарка, напр. 1,2,4")
+    p.add_argument("--bench-batch", type=_int_list, help="Сетка batch-size для бенчмарка, напр. 4,8,16")
+    return p.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    videos = collect_videos(args.videos)
+    if not videos:
+        raise FileNotFoundError(f"По «{args.videos}» не найдено ни одного видео {VIDEO_EXTS}")
+    writer_opts = dict(backend=args.writer, codec=CFG.video.codec, preset=CFG.video.preset,
+                       crf=CFG.video.crf, queue_size=CFG.video.queue)
+
+    from src.models.infer_video import roi_from_args
+    roi = roi_from_args(args)
+
+    if args.bench_workers or args.bench_batch:
+        rows = benchmark(videos, args.weights, args.bench_workers or [args.workers],
+                         args.bench_batch or [args.batch], args.img, args.conf, writer_opts, roi,
+                         args.device)
+        args.out.mkdir(parents=True, exist_ok=True)
+        with open(args.out / "bench.json", "w") as f:
+            json.dump(rows, f, indent=4)
+        return
+
+    run_batch(videos, args.weights, args.out, args.img, args.conf, args.batch,
+              args.workers, writer_opts, args.force, roi=roi, threads=args.threads, device=args.device)
+
+
+if __name__ == "__main__":
+    main()
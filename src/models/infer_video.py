@@ -6,55 +6,134 @@
         --video data/raw/video.mp4 \
         --weights runs/exp11_s/weights/best.pt \
         --out results/out_video.mp4 \
-        --img 960 --conf 0.25
+        --img 960 --conf 0.25 \
+        --writer ffmpeg --codec libx264 --preset veryfast --crf 23
 """
 
+from __future__ import annotations
+
 from pathlib import Path
-import argparse, cv2, math, tqdm
+import argparse, cv2, math, time, tqdm
 from ultralytics import YOLO
 
+from src.config import CFG
+from src.utils.roi import ROI
+from src.utils.video import BACKENDS, open_writer
+
 def parse() -> argparse.Namespace:
     p = argparse.ArgumentParser()
     p.add_argument("--video",  type=Path, required=True, help="Исходное видео")
     p.add_argument("--weights", type=Path, required=True, help="Файл .pt")
     p.add_argument("--out",   type=Path, default="out.mp4", help="Куда сохранить результат")
-    p.add_argument("--img",   type=int,  default=640, help="Размер стороны кадра для инференса")
-    p.add_argument("--conf",  type=float, default=0.25, help="Порог confidence")
-    p.add_argument("--batch", type=int,  default=16,   help="Batch-size для инференса")
+    p.add_argument("--img",   type=int,  default=CFG.infer.img_size, help="Размер стороны кадра для инференса")
+    p.add_argument("--conf",  type=float, default=CFG.infer.conf, help="Порог confidence")
+    p.add_argument("--batch", type=int,  default=CFG.infer.batch, help="Batch-size для инференса")
+    p.add_argument("--device", default=CFG.infer.device, help="cpu | 0 | … (пусто — авто)")
+    p.add_argument("--writer", default=CFG.video.backend, choices=BACKENDS,
+                   help="Бэкенд записи: ffmpeg (pipe) | opencv (mp4v) | auto")
+    p.add_argument("--codec",  default=CFG.video.codec,  help="Кодек ffmpeg")
+    p.add_argument("--preset", default=CFG.video.preset, help="Preset x264/x265")
+    p.add_argument("--crf",    type=int, default=CFG.video.crf, help="CRF x264/x265")
+    p.add_argument("--scale",  type=int, help="Высота выходного видео (ffmpeg), по умолч. — как у исходника")
+    p.add_argument("--queue",  type=int, default=CFG.video.queue,
+                   help="Длина очереди асинхронной записи, 0 — писать синхронно")
+    p.add_argument("--camera", help="Имя камеры из CFG.roi — инференс только по её ROI")
+    p.add_argument("--roi",    help="ROI-прямоугольник x0,y0,x1,y1 (0-1), перекрывает --camera")
     return p.parse_args()
 
-def main():
-    args = parse()
-    model = YOLO(str(args.weights))
+def roi_from_args(args: argparse.Namespace) -> ROI | None:
+    if args.roi:
+        return ROI.parse(args.roi)
+    if args.camera:
+        return ROI.for_camera(args.camera)
+    return None
+
+def infer(model: YOLO, video: Path, out: Path, img: int = CFG.infer.img_size, conf: float = CFG.infer.conf,
+          batch_size: int = CFG.infer.batch, writer_opts: dict | None = None, progress: bool = True,
+          roi: ROI | None = None, device: str = CFG.infer.device) -> dict:
+    """
+    Прогоняет один ролик через уже загруженную *model* и пишет результат в *out*.
+    Модель передаётся снаружи, чтобы воркеры пакетного режима загружали её один раз.
+    С *roi* в сеть идёт только вырезанная область с неквадратным imgsz под её
+    пропорции, а отрисованные боксы вставляются обратно в полный кадр.
 
-    cap = cv2.VideoCapture(str(args.video))
+    :returns: статистика {"video", "out", "frames", "seconds", "fps"}
+    """
+    cap = cv2.VideoCapture(str(video))
     fps = cap.get(cv2.CAP_PROP_FPS)
     w   = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
     h   = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    # CAP_PROP_FRAME_COUNT — лишь оценка (у потоков и части контейнеров 0 или неверна):
+    # используем её только для прогресс-бара, а читаем до конца потока
     total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
 
-    fourcc = cv2.VideoWriter_fourcc(*"mp4v")
-    args.out.parent.mkdir(parents=True, exist_ok=True)
-    writer = cv2.VideoWriter(str(args.out), fourcc, fps, (w, h))
-
-    batch, frames_idx = [], []
-    for idx in tqdm.trange(total, desc="Inference"):
-        ret, frame = cap.read()
-        if not ret:
-            break
-        batch.append(frame)
-        frames_idx.append(idx)
-
-        if len(batch) == args.batch or idx == total - 1:
-            results = model(batch, imgsz=args.img, conf=args.conf, verbose=False)
-            for img_i, res in enumerate(results):
-                plotted = res.plot()          # возвращает BGR-кадр с боксами
-                writer.write(plotted)
-            batch, frames_idx = [], []
-
-    cap.release()
-    writer.release()
-    print(f"✅ Saved → {args.out.resolve()}")
+    # пишем во временный файл и переименовываем только после успеха: иначе оборванный
+    # ролик с «свежим» mtime пакетный режим счёл бы готовым (is_up_to_date)
+    out = Path(out)
+    part = out.with_name(f".{out.stem}.part{out.suffix}")
+    writer = open_writer(part, fps or 25.0, (w, h), **(writer_opts or {}))
+
+    t0 = time.perf_counter()
+    done = 0
+    batch = []
+    bar = tqdm.tqdm(total=total if total > 0 else None, desc=f"Inference {Path(video).name}",
+                    disable=not progress)
+    ok = False
+    try:
+        while True:
+            ret, frame = cap.read()
+            if ret:
+                batch.append(frame)
+                bar.update(1)
+
+            if batch and (len(batch) == batch_size or not ret):   # полный батч или хвост в конце потока
+                if roi is None:
+                    results = model(batch, imgsz=img, conf=conf, device=device or None, verbose=False)
+                else:
+                    crops = [roi.crop(f) for f in batch]
+                    results = model(crops, imgsz=roi.imgsz(batch[0], img), conf=conf,
+                                    device=device or None, verbose=False)
+                for img_i, res in enumerate(results):
+                    plotted = res.plot()          # возвращает BGR-кадр с боксами
+                    if roi is not None:
+                        plotted = roi.paste(batch[img_i], plotted)
+                    writer.write(plotted)
+                done += len(batch)
+                batch = []
+            if not ret:
+                break
+        writer.close()                            # ошибка кодировщика тоже должна попасть в except
+        ok = True
+    finally:
+        bar.close()
+        cap.release()
+        if not ok:
+            try:
+                writer.close()                    # останавливает поток записи / процесс ffmpeg
+            except Exception:
+                pass
+            part.unlink(missing_ok=True)
+    part.replace(out)
+    seconds = time.perf_counter() - t0
+    return {
+        "video": str(video),
+        "out": str(out),
+        "frames": done,
+        "seconds": round(seconds, 3),
+        "fps": round(done / seconds, 2) if seconds > 0 else 0.0,
+    }
+
+def writer_opts(args: argparse.Namespace) -> dict:
+    """Собирает параметры open_writer() из аргументов CLI."""
+    return dict(backend=args.writer, codec=args.codec, preset=args.preset,
+                crf=args.crf, scale=args.scale, queue_size=args.queue)
+
+def main():
+    args = parse()
+    model = YOLO(str(args.weights))
+    stats = infer(model, args.video, args.out, args.img, args.conf, args.batch, writer_opts(args),
+                  roi=roi_from_args(args), device=args.device)
+    print(f"✅ Saved → {args.out.resolve()} ({stats['frames']} frames, {stats['fps']} fps)")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,188 @@
+# src/models/pred_cache.py
+"""
+Кэш «сырых» предсказаний модели по набору изображений.
+
+Для каждого файла весов (ключ — sha1 содержимого) и imgsz в runs/cache/
+хранится компактный .npz: боксы (xyxy, нормированные), score и класс
+каждого предсказания + индекс изображения. Предсказания строятся с низким
+порогом (conf=0.001, как у model.val), так что метрики и PR-кривые затем
+пересчитываются в NumPy при любом conf/IoU без повторного прогона модели.
+Дозапрашиваются только изображения, которых ещё нет в кэше.
+"""
+
+from __future__ import annotations
+
+import hashlib
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Sequence
+
+import numpy as np
+import yaml
+
+from src.config import CFG
+from src.utils.logger import get_logger
+
+log = get_logger(__name__)
+
+DATASET_YAML = Path(__file__).parent / "dataset.yaml"
+IMG_EXTS = (".jpg", ".jpeg", ".png", ".bmp")
+
+
+# ───────────────────── датасет ─────────────────────────────
+def dataset_names() -> List[str]:
+    with open(DATASET_YAML) as f:
+        return list(yaml.safe_load(f)["names"])
+
+
+def dataset_images(split: str = "val") -> List[Path]:
+    """Изображения сплита из dataset.yaml (пути в нём — относительно самого yaml)."""
+    with open(DATASET_YAML) as f:
+        rel = yaml.safe_load(f)[split]
+    img_dir = (DATASET_YAML.parent / rel).resolve()
+    return sorted(p for p in img_dir.iterdir() if p.suffix.lower() in IMG_EXTS)
+
+
+def label_path(img: Path) -> Path:
+    """Путь к YOLO-разметке по пути к изображению (…/images/x.jpg → …/labels/x.txt)."""
+    return img.parent.parent / "labels" / f"{img.stem}.txt"
+
+
+def image_key(path: Path) -> str:
+    """Ключ изображения в кэше: имя + размер + mtime (кадры нового ролика часто называются так же)."""
+    st = path.stat()
+    return f"{path.name}@{st.st_size}-{int(st.st_mtime)}"
+
+
+def file_hash(path: Path, chunk: int = 1 << 20) -> str:
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        while block := f.read(chunk):
+            h.update(block)
+    return h.hexdigest()[:16]
+
+
+# ───────────────────── контейнер ───────────────────────────
+@dataclass
+class Detections:
+    """Плоские массивы боксов, отсортированные по индексу изображения."""
+    names: np.ndarray        # (I,)  ключи изображений (image_key / имя файла)
+    shapes: np.ndarray       # (I, 2) исходные (h, w)
+    img: np.ndarray          # (N,)  индекс изображения
+    boxes: np.ndarray        # (N, 4) xyxy в долях кадра
+    scores: np.ndarray       # (N,)  confidence (для разметки — 1)
+    classes: np.ndarray      # (N,)  id класса
+
+    @classmethod
+    def empty(cls) -> "Detections":
+        return cls(np.zeros(0, dtype="U1"), np.zeros((0, 2), np.int32), np.zeros(0, np.int32),
+                   np.zeros((0, 4), np.float32), np.zeros(0, np.float32), np.zeros(0, np.int16))
+
+    def save(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        np.savez_compressed(path, names=self.names, shapes=self.shapes, img=self.img,
+                            boxes=self.boxes, scores=self.scores, classes=self.classes)
+
+    @classmethod
+    def load(cls, path: Path) -> "Detections":
+        with np.load(path) as z:
+            return cls(*(z[k] for k in ("names", "shapes", "img", "boxes", "scores", "classes")))
+
+    def select(self, names: Sequence[str]) -> "Detections":
+        """Подмножество (и порядок) изображений по именам; отсутствующие игнорируются."""
+        pos = {n: i for i, n in enumerate(self.names.tolist())}
+        old = np.array([pos[n] for n in names if n in pos], dtype=np.int64)
+        remap = np.full(len(self.names), -1, dtype=np.int64)
+        remap[old] = np.arange(len(old))
+        new_img = remap[self.img]
+        keep = np.nonzero(new_img >= 0)[0]
+        keep = keep[np.argsort(new_img[keep], kind="stable")]
+        return Detections(self.names[old], self.shapes[old], new_img[keep].astype(np.int32),
+                          self.boxes[keep], self.scores[keep], self.classes[keep])
+
+    @staticmethod
+    def concat(a: "Detections", b: "Detections") -> "Detections":
+        return Detections(np.concatenate([a.names, b.names]), np.concatenate([a.shapes, b.shapes]),
+                          np.concatenate([a.img, b.img + len(a.names)]).astype(np.int32),
+                          np.concatenate([a.boxes, b.boxes]), np.concatenate([a.scores, b.scores]),
+                          np.concatenate([a.classes, b.classes]))
+
+    def arrays(self) -> tuple:
+        """(img, boxes, scores, classes) — аргументы detection_metrics."""
+        return self.img, self.boxes, self.scores, self.classes
+
+
+# ───────────────────── разметка ────────────────────────────
+def load_ground_truth(images: Sequence[Path], shapes: np.ndarray) -> Detections:
+    """YOLO-txt разметка изображений в том же формате, что и предсказания."""
+    img, boxes, classes = [], [], []
+    for i, p in enumerate(images):
+        lbl = label_path(p)
+        if not lbl.exists():
+            continue
+        rows = np.loadtxt(lbl, ndmin=2, dtype=np.float32)
+        if not rows.size:
+            continue
+        c, xc, yc, w, h = rows.T
+        boxes.append(np.stack([xc - w / 2, yc - h / 2, xc + w / 2, yc + h / 2], 1))
+        classes.append(c.astype(np.int16))
+        img.append(np.full(len(rows), i, dtype=np.int32))
+    if not img:
+        out = Detections.empty()
+        out.names, out.shapes = np.array([p.name for p in images]), shapes
+        return out
+    return Detections(np.array([p.name for p in images]), shapes, np.concatenate(img),
+                      np.concatenate(boxes), np.ones(sum(map(len, img)), np.float32),
+                      np.concatenate(classes))
+
+
+# ───────────────────── предсказания ────────────────────────
+def predict(model, images: Sequence[Path], imgsz: int, batch: int, device: str | None = None,
+            conf: float = 0.001, iou: float = 0.7) -> Detections:
+    """Прогоняет *images* через модель батчами и собирает Detections."""
+    names, shapes, img, boxes, scores, classes = [], [], [], [], [], []
+    for s in range(0, len(images), batch):
+        chunk = images[s:s + batch]
+        results = model.predict([str(p) for p in chunk], imgsz=imgsz, conf=conf, iou=iou,
+                                device=device, verbose=False)
+        for p, r in zip(chunk, results):
+            k = len(names)
+            names.append(image_key(p))
+            shapes.append(r.orig_shape)
+            b = r.boxes
+            boxes.append(b.xyxyn.cpu().numpy().astype(np.float32))
+            scores.append(b.conf.cpu().numpy().astype(np.float32))
+            classes.append(b.cls.cpu().numpy().astype(np.int16))
+            img.append(np.full(len(b), k, dtype=np.int32))
+    if not names:
+        return Detections.empty()
+    return Detections(np.array(names), np.array(shapes, dtype=np.int32), np.concatenate(img),
+                      np.concatenate(boxes), np.concatenate(scores), np.concatenate(classes))
+
+
+def cache_path(weights: Path, imgsz: int) -> Path:
+    return CFG.paths.runs / "cache" / f"preds_{file_hash(weights)}_{imgsz}.npz"
+
+
+def cached_predictions(weights: Path, images: Sequence[Path], imgsz: int | None = None,
+                       batch: int | None = None, device: str | None = None) -> Detections:
+    """
+    Предсказания *weights* по *images* из кэша; недостающие изображения
+    досчитываются моделью и дописываются в кэш.
+    """
+    imgsz = imgsz or CFG.train.img_size
+    path = cache_path(weights, imgsz)
+    cached = Detections.load(path) if path.exists() else Detections.empty()
+    known = set(cached.names.tolist())
+    missing = [p for p in images if image_key(p) not in known]
+
+    if missing:
+        from ultralytics import YOLO
+        log.info(f"Кэш {path.name}: досчитываю {len(missing)} из {len(images)} изображений")
+        fresh = predict(YOLO(str(weights)), missing, imgsz, batch or CFG.train.batch,
+                        device if device is not None else CFG.train.device)
+        cached = Detections.concat(cached, fresh)
+        cached.save(path)
+    else:
+        log.info(f"Кэш {path.name}: все {len(images)} изображений уже посчитаны")
+    return cached.select([image_key(p) for p in images])
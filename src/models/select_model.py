@@ -0,0 +1,190 @@
+# src/models/select_model.py
+"""
+Выбор модели для деплоя по соотношению латентность / точность.
+
+Для каждого зарегистрированного файла весов (runs/**/weights/best.pt) и его
+экспортированных вариантов (best.onnx, best.torchscript, best_openvino_model/ …)
+замеряется CPU-латентность (мс/кадр) на деплойном imgsz и batch, она
+объединяется с сохранённым val mAP50-95 (best.metrics.json от evaluate.py,
+иначе — последняя строка results.csv) и строится Парето-фронт.
+Выбирается самая точная модель, укладывающаяся в бюджет латентности;
+результат пишется в runs/selected.json, и `src.main infer` берёт её по умолчанию.
+
+Замеры кэшируются в runs/cache/latency.json (ключ — хэш весов, imgsz, batch, хост).
+
+Запуск:
+    python -m src.models.select_model --budget 40 [--img 640] [--batch 1] [--export onnx,openvino]
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import hashlib
+import json
+import platform
+from pathlib import Path
+from typing import List, Optional
+
+from src.config import CFG
+from src.models.pred_cache import file_hash
+from src.utils.logger import get_logger
+
+log = get_logger(__name__)
+
+# суффиксы экспортов Ultralytics рядом с best.pt, которые исполняются на CPU
+# (TensorRT best.engine — только GPU, в CPU-бенчмарк не входит)
+VARIANTS = ("best.onnx", "best.torchscript", "best_openvino_model", "best_ncnn_model")
+LATENCY_CACHE = CFG.paths.runs / "cache" / "latency.json"
+
+
+# ───────────────────── кандидаты ──────────────────────────
+def registered_weights() -> List[Path]:
+    """best.pt всех экспериментов + уже экспортированные варианты."""
+    out: List[Path] = []
+    for best in sorted(CFG.paths.runs.glob("**/weights/best.pt")):
+        out.append(best)
+        out.extend(best.parent / v for v in VARIANTS if (best.parent / v).exists())
+    return out
+
+
+def export_variants(formats: List[str], imgsz: int) -> None:
+    """Экспортирует недостающие варианты (onnx, openvino, torchscript, …) для всех best.pt."""
+    from ultralytics import YOLO
+    for best in sorted(CFG.paths.runs.glob("**/weights/best.pt")):
+        for fmt in formats:
+            if fmt == "engine":
+                raise ValueError("TensorRT (engine) не исполняется на CPU — для select не экспортируется")
+            if any(fmt in v and (best.parent / v).exists() for v in VARIANTS):
+                continue
+            log.info(f"Экспорт {best} → {fmt}")
+            YOLO(str(best)).export(format=fmt, imgsz=imgsz)
+
+
+def weights_id(path: Path) -> str:
+    """sha1 файла весов или (для openvino/ncnn) всех файлов каталога экспорта."""
+    if path.is_file():
+        return file_hash(path)
+    h = hashlib.sha1()
+    for f in sorted(p for p in path.rglob("*") if p.is_file()):
+        h.update(file_hash(f).encode())
+    return h.hexdigest()[:16]
+
+
+def val_map(weights: Path) -> Optional[float]:
+    """mAP50-95 на val для best.pt этого эксперимента (экспорт наследует его)."""
+    metrics = weights.parent / "best.metrics.json"
+    if metrics.exists():
+        with open(metrics) as f:
+            return json.load(f).get("mAP50-95")
+    results = weights.parent.parent / "results.csv"
+    if results.exists():
+        with open(results) as f:
+            rows = list(csv.DictReader(f))
+        if rows:
+            row = {k.strip(): v for k, v in rows[-1].items()}
+            if "metrics/mAP50-95(B)" in row:
+                return round(float(row["metrics/mAP50-95(B)"]), 4)
+    return None
+
+
+# ───────────────────── замеры ─────────────────────────────
+def latency(weights: Path, imgsz: int, batch: int) -> float:
+    """CPU мс/кадр с кэшем по (хэш весов, imgsz, batch, хост)."""
+    from src.utils.bench import measure_latency
+
+    cache = json.loads(LATENCY_CACHE.read_text()) if LATENCY_CACHE.exists() else {}
+    key = f"{weights_id(weights)}_{imgsz}_{batch}_{platform.node()}"
+    if key not in cache:
+        cache[key] = measure_latency(weights, imgsz, batch, device="cpu")
+        LATENCY_CACHE.parent.mkdir(parents=True, exist_ok=True)
+        LATENCY_CACHE.write_text(json.dumps(cache, indent=2))
+    return cache[key]
+
+
+def pareto_front(rows: List[dict]) -> List[dict]:
+    """Кандидаты, которых никто не превосходит одновременно по латентности и mAP."""
+    front = []
+    for r in rows:
+        dominated = any(
+            o["latency_ms"] <= r["latency_ms"] and o["mAP50-95"] >= r["mAP50-95"]
+            and (o["latency_ms"] < r["latency_ms"] or o["mAP50-95"] > r["mAP50-95"])
+            for o in rows
+        )
+        if not dominated:
+            front.append(r)
+    return sorted(front, key=lambda r: r["latency_ms"])
+
+
+def choose(rows: List[dict], budget_ms: float) -> dict:
+    """Самая точная модель в бюджете; если в бюджет не влезает никто — самая быстрая."""
+    fit = [r for r in rows if r["latency_ms"] <= budget_ms]
+    if not fit:
+        log.warning(f"Ни одна модель не укладывается в {budget_ms} мс — беру самую быструю")
+        return min(rows, key=lambda r: r["latency_ms"])
+    return max(fit, key=lambda r: (r["mAP50-95"], -r["latency_ms"]))
+
+
+def select(budget_ms: float = CFG.select.budget_ms, imgsz: int = CFG.select.img_size,
+           batch: int = CFG.select.batch, export: Optional[List[str]] = None) -> dict:
+    if export:
+        export_variants(export, imgsz)
+
+    rows = []
+    for w in registered_weights():
+        m = val_map(w)
+        if m is None:
+            log.warning(f"{w}: нет val mAP (запустите evaluate) — пропуск")
+            continue
+        rows.append({"weights": str(w), "mAP50-95": m, "latency_ms": latency(w, imgsz, batch)})
+    if not rows:
+        raise FileNotFoundError("Не найдено ни одного best.pt с метриками в runs/")
+
+    front = pareto_front(rows)
+    best = choose(front, budget_ms)
+    result = {
+        "selected": best["weights"],
+        "budget_ms": budget_ms,
+        "imgsz": imgsz,
+        "batch": batch,
+        "host": platform.node(),
+        "pareto": front,
+        "candidates": sorted(rows, key=lambda r: r["latency_ms"]),
+    }
+    with open(CFG.paths.selected, "w") as f:
+        json.dump(result, f, indent=4)
+
+    lines = [f"{'★' if r['weights'] == best['weights'] else ('·' if r in front else ' ')} "
+             f"{r['latency_ms']:>8.1f} ms  mAP50-95 {r['mAP50-95']:<7} {r['weights']}"
+             for r in result["candidates"]]
+    log.info("Кандидаты (★ — выбран, · — Парето-фронт):\n" + "\n".join(lines))
+    log.info(f"✅ Выбрано {best['weights']} → {CFG.paths.selected}")
+    return result
+
+
+def selected_weights() -> Optional[Path]:
+    """Модель из runs/selected.json, если выбор делался и файл ещё существует."""
+    if not CFG.paths.selected.exists():
+        return None
+    with open(CFG.paths.selected) as f:
+        path = Path(json.load(f)["selected"])
+    return path if path.exists() else None
+
+
+def parse_args() -> argparse.Namespace:
+    p = argparse.ArgumentParser()
+    p.add_argument("--budget", type=float, default=CFG.select.budget_ms, help="Бюджет латентности, мс/кадр (CPU)")
+    p.add_argument("--img", type=int, default=CFG.select.img_size, help="Деплойный imgsz")
+    p.add_argument("--batch", type=int, default=CFG.select.batch, help="Деплойный batch")
+    p.add_argument("--export", type=lambda s: [x for x in s.split(",") if x],
+                   help="Экспортировать недостающие варианты: onnx,openvino,torchscript")
+    return p.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    select(args.budget, args.img, args.batch, args.export)
+
+
+if __name__ == "__main__":
+    main()
@@ -6,8 +6,18 @@ train.py
 
 Запуск:
     python -m src.models.train --size s|n|x [--epochs 50] \
-                               [--img 640] [--batch 16] [--lr0 0.01] \
-                               [--weights /path/to/yolo11s.pt]
+                               [--img 640] [--batch 16] [--lr0 0.01] [--device 0] \
+                               [--weights /path/to/yolo11s.pt] [--lazy-aug]
+
+Умолчания берутся из CFG (config.yaml / профиль хоста / DISHES__TRAIN__*),
+итоговая конфигурация сохраняется в runs/<exp>/config.yaml.
+
+--distill-from runs/exp11_x/weights/best.pt: дистилляция учителя в ученика
+(псевдо-метки учителя из кэша с порогами CFG.pseudo, см. distill.py);
+итог — runs/exp11_<size>_distill/distill.json.
+
+--lazy-aug: обучение на исходных кадрах (split_dataset --lazy) с аугментацией
+Albumentations на лету в воркерах DataLoader-а, без data/processed.
 """
 
 from __future__ import annotations
@@ -17,7 +27,7 @@ from typing import Optional
 
 from ultralytics import YOLO
 import ultralytics
-from src.config import CFG
+from src.config import CFG, dump_config
 from src.utils.logger import get_logger
 
 logger = get_logger(__name__)
@@ -35,8 +45,16 @@ def parse_args() -> argparse.Namespace:
     p.add_argument("--batch", type=int, default=CFG.train.batch)
     p.add_argument("--lr0", type=float, default=CFG.train.lr0,
                    help="Начальный learning-rate")
+    p.add_argument("--device", default=CFG.train.device,
+                   help="GPU id или cpu")
     p.add_argument("--weights", type=Path,
                    help="Явный путь к .pt или .yaml")
+    p.add_argument("--lazy-aug", action="store_true",
+                   help="Аугментация на лету по data/dataset_lazy вместо копий на диске")
+    p.add_argument("--distill-from", type=Path,
+                   help="Веса учителя (напр. runs/exp11_x/weights/best.pt) — режим дистилляции")
+    p.add_argument("--distill-conf", type=float, default=CFG.pseudo.conf,
+                   help="Общий порог confidence боксов учителя (поклассовые — CFG.pseudo.class_conf)")
     return p.parse_args()
 
 
@@ -95,19 +113,46 @@ def main():
         f"({args.img}px, batch {args.batch}) на {args.epochs} эпох"
     )
 
+    extra = {}
+    data_yaml = Path(__file__).parent / "dataset.yaml"
+    name = f"exp11_{args.size}"
+    if args.distill_from:
+        if args.lazy_aug:
+            raise ValueError("--distill-from и --lazy-aug пока не совмещаются")
+        from src.models.distill import build_distill_dataset
+        from src.data.pseudo_label import class_thresholds
+        data_yaml = build_distill_dataset(args.distill_from, class_thresholds(args.distill_conf))
+        name += "_distill"
+        logger.info(f"🎓 Дистилляция: учитель {args.distill_from}")
+    if args.lazy_aug:
+        from src.data.lazy_dataset import LazyAugTrainer
+        extra["trainer"] = LazyAugTrainer
+        data_yaml = Path(__file__).parent / "dataset_lazy.yaml"
+        logger.info("🔀 Аугментация на лету (Albumentations в DataLoader), датасет data/dataset_lazy")
+
+    dump_config(CFG.paths.runs / name, {"train": dict(model_size=args.size, epochs=args.epochs,
+                                                      img_size=args.img, batch=args.batch,
+                                                      lr0=args.lr0, device=args.device)})
     results = model.train(
-        data=str(Path(__file__).parent / "dataset.yaml"),
+        **extra,
+        data=str(data_yaml),
         imgsz=args.img,
         epochs=args.epochs,
         batch=args.batch,
-        device=CFG.train.device,
+        device=args.device,
         lr0=args.lr0,
         project=CFG.paths.runs,
-        name=f"exp11_{args.size}",
+        name=name,
         exist_ok=True,
     )
     logger.info(results)
 
+    if args.distill_from:
+        from src.models.distill import record_result
+        from src.utils.metrics import summarise_metrics
+        record_result(CFG.paths.runs / name, args.distill_from, args.size,
+                      summarise_metrics(results), args.img)
+
 
 if __name__ == "__main__":
     main()
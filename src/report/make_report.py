@@ -82,6 +82,32 @@ def read_metrics(run: Path) -> dict:
     }
 
 
+def read_eval(run: Path) -> dict:
+    """метрики evaluate.py (weights/best.metrics.json), если они сохранены"""
+    path = run / "weights" / "best.metrics.json"
+    if not path.exists():
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def eval_tables(ev: dict) -> str:
+    """Markdown-таблицы по классам и по размерам объектов."""
+    md = ""
+    if ev.get("per_class"):
+        md += "| класс | AP50 | AP50-95 | precision | recall |\n|---|---|---|---|---|\n"
+        for name, m in sorted(ev["per_class"].items(), key=lambda kv: kv[1]["AP50-95"]):
+            md += f"| {name} | {m['AP50']} | {m['AP50-95']} | {m['precision']} | {m['recall']} |\n"
+        md += "\n"
+    if ev.get("sizes"):
+        md += "| размер | объектов | mAP50 | mAP50-95 |\n|---|---|---|---|\n"
+        for name, m in ev["sizes"].items():
+            md += f"| {name} | {m['n_gt']} | {m['mAP50'] if m['mAP50'] is not None else '—'} " \
+                  f"| {m['mAP50-95'] if m['mAP50-95'] is not None else '—'} |\n"
+        md += "\n"
+    return md
+
+
 # ───────────────────── main ─────────────────────────
 def main() -> None:
     report_md = CFG.paths.root / "report" / "report.md"
@@ -110,10 +136,27 @@ def main() -> None:
                 rep.write(f"- **{k}**: {v}\n")
             rep.write("\n")
 
+            tables = eval_tables(read_eval(run))
+            if tables:
+                rep.write("### Метрики по классам и размерам (val)\n\n" + tables)
+
             imgs = plot_history(run, fig_dir)
             for img in imgs:
                 rep.write(f"![{img.name}](figures/{img.name})\n\n")
 
+        distill = sorted(CFG.paths.runs.glob("*/distill.json"))
+        if distill:
+            rep.write("## Дистилляция: точность vs латентность (CPU)\n\n"
+                      "| ученик | учитель | mAP50-95 ученика | mAP50-95 учителя "
+                      "| мс/кадр ученика | мс/кадр учителя |\n|---|---|---|---|---|---|\n")
+            for path in distill:
+                with open(path) as f:
+                    d = json.load(f)
+                rep.write(f"| {d['student']} ({path.parent.name}) | {Path(d['teacher']).parent.parent.name} "
+                          f"| {d.get('mAP50-95')} | {d.get('teacher_mAP50-95', '—')} "
+                          f"| {d.get('latency_ms_cpu')} | {d.get('teacher_latency_ms_cpu')} |\n")
+            rep.write("\n")
+
     log.info(f"Report ready → {report_md}")
 
 
@@ -0,0 +1,49 @@
+# src/utils/bench.py
+
+"""
+bench.py
+Замер латентности инференса (мс на кадр) для файла весов.
+Кадр берётся из val-сплита (реальные детекции → реальная нагрузка на NMS),
+если его нет — случайный шум.
+"""
+
+from __future__ import annotations
+
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+def _sample_frame(imgsz: int) -> np.ndarray:
+    from src.models.pred_cache import dataset_images
+    try:
+        imgs = dataset_images("val")
+    except (FileNotFoundError, KeyError):
+        imgs = []
+    frame = cv2.imread(str(imgs[0])) if imgs else None
+    if frame is None:
+        frame = np.random.randint(0, 255, (imgsz, imgsz, 3), dtype=np.uint8)
+    return frame
+
+
+def measure_latency(weights: Path, imgsz: int = 640, batch: int = 1, device: str = "cpu",
+                    warmup: int = 3, iters: int = 20) -> float:
+    """Средняя латентность в мс на кадр при батче *batch* (после *warmup* прогревочных прогонов)."""
+    from ultralytics import YOLO
+    model = YOLO(str(weights), task="detect")
+    frames = [_sample_frame(imgsz)] * batch
+    kw = dict(imgsz=imgsz, device=device, verbose=False)
+    for _ in range(warmup):
+        model(frames, **kw)
+    t0 = time.perf_counter()
+    for _ in range(iters):
+        model(frames, **kw)
+    ms = (time.perf_counter() - t0) * 1000 / (iters * batch)
+    logger.info(f"{weights}: {ms:.1f} ms/frame ({device}, imgsz={imgsz}, batch={batch})")
+    return round(ms, 2)
@@ -7,6 +7,8 @@ metrics.py
 
 from __future__ import annotations
 
+from typing import Optional
+
 import numpy as np
 
 
@@ -29,14 +31,38 @@ def _scalar(x):
     return float(np.asarray(x).mean())
 
 
+def per_class_metrics(classes, ap, p, r, names) -> dict:
+    """
+    Таблица по классам: {name: {AP50, AP50-95, precision, recall}}.
+    *ap* — (C, 10) AP по порогам IoU 0.50:0.95, строки соответствуют *classes*.
+    """
+    ap = np.asarray(ap)
+    out = {}
+    for k, c in enumerate(np.asarray(classes).astype(int)):
+        out[str(names[c])] = {
+            "AP50":      round(float(ap[k, 0]), 4),
+            "AP50-95":   round(float(ap[k].mean()), 4),
+            "precision": round(float(p[k]), 4),
+            "recall":    round(float(r[k]), 4),
+        }
+    return out
+
+
 def summarise_metrics(res):
     """
     От Ultralytics приходит DetMetrics со множеством полей.
-    Выбираем ключевые метрики и округляем до 4 знаков.
+    Выбираем ключевые метрики и округляем до 4 знаков; поклассовые AP/P/R
+    берём из тех же массивов (box.all_ap, box.p, box.r), без повторной валидации.
     """
     box = res.box  # DetMetrics.box — то, где лежат mp, mr, map…
     grab = lambda *names: next(getattr(box, n, None) for n in names if hasattr(box, n))
 
+    per_class = {}
+    classes, all_ap = getattr(box, "ap_class_index", None), getattr(box, "all_ap", None)
+    if classes is not None and all_ap is not None and len(all_ap):
+        per_class = per_class_metrics(classes, all_ap, np.asarray(box.p), np.asarray(box.r),
+                                      getattr(res, "names", None) or {int(c): str(c) for c in classes})
+
     return {
         "mAP50":     round(_scalar(grab("map50", "ap50")), 4),
         "mAP50-95":  round(_scalar(grab("map",   "ap")),   4),
@@ -45,4 +71,227 @@ def summarise_metrics(res):
         "f1":        round(_scalar(grab("f1")), 4),
         # сколько изображений было у валидатора
         "dataset_size": getattr(res, "dataset", None).n if hasattr(res, "dataset") else None,
+        "per_class": per_class,
+    }
+
+
+# ─────────────────── mAP без Ultralytics (по кэшу предсказаний) ─────────────────── #
+# Векторизованный аналог того, что считает DetMetrics: сопоставление предсказаний с
+# разметкой на порогах IoU 0.50:0.95, 101-точечный AP (COCO), P/R/F1 в точке max-F1.
+# Боксы везде — xyxy в нормированных координатах (IoU инвариантен к масштабу осей).
+
+IOU_THRESHOLDS = np.linspace(0.5, 0.95, 10)
+_trapz = getattr(np, "trapezoid", None) or np.trapz     # numpy ≥ 2.0 переименовал trapz
+
+
+def box_iou(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Матрица IoU (N, M) для боксов xyxy."""
+    lt = np.maximum(a[:, None, :2], b[None, :, :2])
+    rb = np.minimum(a[:, None, 2:], b[None, :, 2:])
+    inter = np.clip(rb - lt, 0, None).prod(-1)
+    area_a = (a[:, 2:] - a[:, :2]).prod(-1)
+    area_b = (b[:, 2:] - b[:, :2]).prod(-1)
+    return inter / (area_a[:, None] + area_b[None, :] - inter + 1e-9)
+
+
+def nms(boxes: np.ndarray, scores: np.ndarray, classes: np.ndarray, iou: float) -> np.ndarray:
+    """Поклассовый greedy NMS; возвращает индексы оставленных боксов."""
+    shifted = boxes + classes[:, None].astype(boxes.dtype) * 4.0   # разносим классы, чтобы не пересекались
+    order = np.argsort(-scores, kind="stable")
+    keep = []
+    while order.size:
+        i = order[0]
+        keep.append(i)
+        if order.size == 1:
+            break
+        ious = box_iou(shifted[i:i + 1], shifted[order[1:]])[0]
+        order = order[1:][ious <= iou]
+    return np.asarray(keep, dtype=np.int64)
+
+
+def match_predictions(pred_boxes: np.ndarray, pred_cls: np.ndarray,
+                      gt_boxes: np.ndarray, gt_cls: np.ndarray,
+                      iou_thrs: np.ndarray = IOU_THRESHOLDS) -> np.ndarray:
+    """
+    TP-матрица (N_pred, T): предсказание — TP на пороге t, если оно в паре
+    с ещё не занятым GT того же класса с IoU ≥ t (жадно по убыванию IoU).
+    """
+    tp = np.zeros((len(pred_boxes), len(iou_thrs)), dtype=bool)
+    if not len(pred_boxes) or not len(gt_boxes):
+        return tp
+    iou = box_iou(gt_boxes, pred_boxes) * (gt_cls[:, None] == pred_cls[None, :])
+    for j, t in enumerate(iou_thrs):
+        g, p = np.nonzero(iou >= t)
+        if not len(g):
+            continue
+        order = np.argsort(-iou[g, p], kind="stable")
+        g, p = g[order], p[order]
+        _, first = np.unique(p, return_index=True)         # лучший GT для каждого предсказания
+        first.sort()                                       # сохраняем порядок по убыванию IoU
+        g, p = g[first], p[first]
+        _, first = np.unique(g, return_index=True)         # и лучшее предсказание для каждого GT
+        tp[p[first], j] = True
+    return tp
+
+
+def _ap(recall: np.ndarray, precision: np.ndarray) -> float:
+    """101-точечный AP (COCO) по кривой precision/recall."""
+    mrec = np.concatenate(([0.0], recall, [1.0]))
+    mpre = np.concatenate(([1.0], precision, [0.0]))
+    mpre = np.flip(np.maximum.accumulate(np.flip(mpre)))   # огибающая precision
+    x = np.linspace(0, 1, 101)
+    return float(_trapz(np.interp(x, mrec, mpre), x))
+
+
+def _smooth(y: np.ndarray, f: float = 0.05) -> np.ndarray:
+    nf = round(len(y) * f * 2) // 2 + 1
+    p = np.ones(nf // 2)
+    yp = np.concatenate((p * y[0], y, p * y[-1]))
+    return np.convolve(yp, np.ones(nf) / nf, mode="valid")
+
+
+def ap_per_class(tp: np.ndarray, conf: np.ndarray, pred_cls: np.ndarray,
+                 gt_cls: np.ndarray, nc: int, eps: float = 1e-16) -> dict:
+    """
+    AP по классам и порогам IoU + P/R/F1 в точке, где средний F1 максимален.
+    Классы без разметки пропускаются (как в Ultralytics).
+
+    :returns: {"classes", "ap" (C, T), "p", "r", "f1", "conf", "px", "pr_curve" (C, 1000)}
+    """
+    order = np.argsort(-conf, kind="stable")
+    tp, conf, pred_cls = tp[order], conf[order], pred_cls[order]
+
+    px = np.linspace(0, 1, 1000)
+    n_gt = np.bincount(gt_cls.astype(np.int64), minlength=nc)[:nc]
+    classes = np.nonzero(n_gt)[0]
+    ap = np.zeros((len(classes), tp.shape[1]))
+    p_curve = np.zeros((len(classes), len(px)))
+    r_curve = np.zeros((len(classes), len(px)))
+    pr_curve = np.zeros((len(classes), len(px)))
+
+    for k, c in enumerate(classes):
+        m = pred_cls == c
+        if not m.any():
+            continue
+        tpc = tp[m].cumsum(0)
+        fpc = (~tp[m]).cumsum(0)
+        recall = tpc / (n_gt[c] + eps)
+        precision = tpc / (tpc + fpc)
+        r_curve[k] = np.interp(-px, -conf[m], recall[:, 0], left=0)
+        p_curve[k] = np.interp(-px, -conf[m], precision[:, 0], left=1)
+        for j in range(tp.shape[1]):
+            ap[k, j] = _ap(recall[:, j], precision[:, j])
+        pr_curve[k] = np.interp(px, recall[:, 0], precision[:, 0], right=0)
+
+    f1_curve = 2 * p_curve * r_curve / (p_curve + r_curve + eps)
+    # окно сглаживания 0.1 — как в ultralytics.utils.metrics.ap_per_class (не дефолтные 0.05)
+    i = int(_smooth(f1_curve.mean(0), 0.1).argmax()) if len(classes) else 0
+    return {
+        "classes": classes,
+        "ap": ap,
+        "p": p_curve[:, i],
+        "r": r_curve[:, i],
+        "f1": f1_curve[:, i],
+        "conf": float(px[i]),
+        "px": px,
+        "pr_curve": pr_curve,
+    }
+
+
+def detection_metrics(pred_img: np.ndarray, pred_boxes: np.ndarray, pred_scores: np.ndarray,
+                      pred_cls: np.ndarray, gt_img: np.ndarray, gt_boxes: np.ndarray,
+                      gt_cls: np.ndarray, nc: int, conf: float = 0.001,
+                      iou: Optional[float] = None, n_images: Optional[int] = None) -> dict:
+    """
+    mAP / P / R / F1 по плоским массивам предсказаний и разметки
+    (img-индекс на каждый бокс, оба набора отсортированы по нему).
+    *conf* отбрасывает слабые предсказания, *iou* — повторный NMS
+    (имеет смысл только строже того, с которым строился кэш).
+
+    :returns: те же ключи, что и summarise_metrics, + "_raw" (результат ap_per_class)
+    """
+    keep = pred_scores >= conf
+    pred_img, pred_boxes, pred_scores, pred_cls = pred_img[keep], pred_boxes[keep], pred_scores[keep], pred_cls[keep]
+
+    n_img = n_images or int(max(pred_img.max(initial=-1), gt_img.max(initial=-1))) + 1
+    p_split = np.searchsorted(pred_img, np.arange(n_img + 1))
+    g_split = np.searchsorted(gt_img, np.arange(n_img + 1))
+
+    tps, keeps = [], []
+    for k in range(n_img):
+        ps, pe = p_split[k], p_split[k + 1]
+        idx = np.arange(ps, pe)
+        if iou is not None and len(idx):
+            idx = idx[nms(pred_boxes[idx], pred_scores[idx], pred_cls[idx], iou)]
+        gs, ge = g_split[k], g_split[k + 1]
+        tps.append(match_predictions(pred_boxes[idx], pred_cls[idx], gt_boxes[gs:ge], gt_cls[gs:ge]))
+        keeps.append(idx)
+    idx = np.concatenate(keeps) if keeps else np.zeros(0, dtype=np.int64)
+    tp = np.concatenate(tps) if tps else np.zeros((0, len(IOU_THRESHOLDS)), dtype=bool)
+
+    raw = ap_per_class(tp, pred_scores[idx], pred_cls[idx], gt_cls, nc)
+    raw.update(n_pred=len(idx), n_gt=len(gt_cls), n_tp50=int(tp[:, 0].sum()))
+    mean = lambda a: float(a.mean()) if a.size else 0.0
+    return {
+        "mAP50": round(mean(raw["ap"][:, 0]), 4),
+        "mAP50-95": round(mean(raw["ap"]), 4),
+        "precision": round(mean(raw["p"]), 4),
+        "recall": round(mean(raw["r"]), 4),
+        "f1": round(mean(raw["f1"]), 4),
+        "dataset_size": n_img,
+        "_raw": raw,
     }
+
+
+def conf_sweep(*arrays, nc: int, confs, iou: Optional[float] = None,
+               n_images: Optional[int] = None) -> list[dict]:
+    """
+    Пересчёт метрик для набора порогов confidence (аргументы как у detection_metrics).
+    Кроме mAP, для каждого порога — P/R рабочей точки: доля верных среди
+    оставленных боксов и доля найденных объектов при IoU 0.5.
+    """
+    rows = []
+    for c in confs:
+        m = detection_metrics(*arrays, nc=nc, conf=float(c), iou=iou, n_images=n_images)
+        raw = m["_raw"]
+        p = raw["n_tp50"] / raw["n_pred"] if raw["n_pred"] else 0.0
+        r = raw["n_tp50"] / raw["n_gt"] if raw["n_gt"] else 0.0
+        rows.append({
+            "conf": round(float(c), 4),
+            "mAP50": m["mAP50"],
+            "mAP50-95": m["mAP50-95"],
+            "precision": round(p, 4),
+            "recall": round(r, 4),
+            "f1": round(2 * p * r / (p + r), 4) if p + r else 0.0,
+            "detections": raw["n_pred"],
+        })
+    return rows
+
+
+# Границы размеров объектов как в COCO (площадь бокса в пикселях исходного кадра)
+SIZE_RANGES = {"small": (0.0, 32.0 ** 2), "medium": (32.0 ** 2, 96.0 ** 2), "large": (96.0 ** 2, np.inf)}
+
+
+def size_breakdown(pred_img, pred_boxes, pred_scores, pred_cls, gt_img, gt_boxes, gt_cls,
+                   shapes: np.ndarray, nc: int, conf: float = 0.001) -> dict:
+    """
+    mAP отдельно для small / medium / large объектов.
+    Разметка и предсказания фильтруются по собственной площади бокса;
+    *shapes* — (I, 2) исходные (h, w) изображений.
+    """
+    def area(img, boxes):
+        hw = shapes[img].astype(np.float64)
+        return (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1]) * hw[:, 0] * hw[:, 1]
+
+    pa, ga = area(pred_img, pred_boxes), area(gt_img, gt_boxes)
+    out = {}
+    for name, (lo, hi) in SIZE_RANGES.items():
+        pm, gm = (pa >= lo) & (pa < hi), (ga >= lo) & (ga < hi)
+        if not gm.any():
+            out[name] = {"n_gt": 0, "mAP50": None, "mAP50-95": None}
+            continue
+        m = detection_metrics(pred_img[pm], pred_boxes[pm], pred_scores[pm], pred_cls[pm],
+                              gt_img[gm], gt_boxes[gm], gt_cls[gm], nc=nc, conf=conf,
+                              n_images=len(shapes))
+        out[name] = {"n_gt": int(gm.sum()), "mAP50": m["mAP50"], "mAP50-95": m["mAP50-95"]}
+    return out
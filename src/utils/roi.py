@@ -0,0 +1,147 @@
+# src/utils/roi.py
+
+"""
+roi.py
+Region-of-interest для стационарных камер: кадр обрезается до ROI перед
+инференсом, статичные области закрашиваются, а боксы переводятся обратно
+в координаты полного кадра.
+
+Координаты ROI — нормированные (0-1), как в YOLO-разметке, поэтому одна и
+та же конфигурация подходит для любого разрешения потока.
+"""
+
+from __future__ import annotations
+
+import math
+from typing import Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from src.config import CFG, CameraROI
+
+PAD_VALUE = 114                      # серый, которым Ultralytics заполняет letterbox
+
+Point = Tuple[float, float]
+
+
+def roi_imgsz(w: int, h: int, img: int, stride: int = 32) -> Tuple[int, int]:
+    """
+    Неквадратный imgsz (h, w) под пропорции ROI: длинная сторона = *img*,
+    короткая — пропорционально, обе кратны *stride*. Так letterbox почти не
+    добавляет пустых полей, и сеть считает только полезные пиксели.
+    """
+    scale = img / max(w, h)
+    return (max(stride, math.ceil(h * scale / stride) * stride),
+            max(stride, math.ceil(w * scale / stride) * stride))
+
+
+class ROI:
+    """
+    :param rect:    (x0, y0, x1, y1) — прямоугольник ROI
+    :param polygon: [(x, y), ...] — ROI-многоугольник; всё вне него закрашивается
+    :param exclude: список многоугольников со статичными областями, которые закрашиваются
+    """
+
+    def __init__(self, rect: Optional[Sequence[float]] = None,
+                 polygon: Optional[Sequence[Point]] = None,
+                 exclude: Sequence[Sequence[Point]] = ()):
+        if rect is None and polygon is None:
+            raise ValueError("ROI: нужно задать rect или polygon")
+        self.rect = tuple(rect) if rect is not None else None
+        self.polygon = [tuple(p) for p in polygon] if polygon is not None else None
+        self.exclude = [[tuple(p) for p in poly] for poly in exclude]
+        self._shape: Optional[Tuple[int, int]] = None
+        self._box: Tuple[int, int, int, int] = (0, 0, 0, 0)
+        self._mask: Optional[np.ndarray] = None
+
+    @classmethod
+    def from_config(cls, cam: CameraROI) -> "ROI":
+        return cls(cam.rect, cam.polygon, cam.exclude)
+
+    @classmethod
+    def for_camera(cls, name: str) -> "ROI":
+        if name not in CFG.roi:
+            raise KeyError(f"Камера «{name}» не описана в CFG.roi (есть: {sorted(CFG.roi)})")
+        return cls.from_config(CFG.roi[name])
+
+    @classmethod
+    def parse(cls, s: str) -> "ROI":
+        """Прямоугольник из строки CLI "x0,y0,x1,y1"."""
+        vals = [float(v) for v in s.split(",")]
+        if len(vals) != 4:
+            raise ValueError(f"ROI «{s}»: ожидается x0,y0,x1,y1")
+        return cls(rect=vals)
+
+    # ─────────────── геометрия ───────────────
+    def _px(self, pts: Sequence[Point], w: int, h: int) -> np.ndarray:
+        return np.array([(x * w, y * h) for x, y in pts], dtype=np.float32)
+
+    def _prepare(self, h: int, w: int) -> None:
+        """Пересчитывает пиксельный прямоугольник и маску под размер кадра (один раз)."""
+        if self._shape == (h, w):
+            return
+        if self.polygon is not None:
+            pts = self._px(self.polygon, w, h)
+            x0, y0 = pts.min(axis=0)
+            x1, y1 = pts.max(axis=0)
+        else:
+            x0, y0, x1, y1 = self.rect[0] * w, self.rect[1] * h, self.rect[2] * w, self.rect[3] * h
+        x0, y0 = max(0, int(x0)), max(0, int(y0))
+        x1, y1 = min(w, int(math.ceil(x1))), min(h, int(math.ceil(y1)))
+        if x1 <= x0 or y1 <= y0:
+            raise ValueError(f"ROI пуст для кадра {w}x{h}")
+        self._box = (x0, y0, x1, y1)
+
+        mask = None
+        if self.polygon is not None or self.exclude:
+            mask = np.zeros((y1 - y0, x1 - x0), dtype=np.uint8)
+            offset = np.array([x0, y0], dtype=np.float32)
+            if self.polygon is not None:
+                cv2.fillPoly(mask, [np.round(self._px(self.polygon, w, h) - offset).astype(np.int32)], 255)
+            else:
+                mask[:] = 255
+            for poly in self.exclude:
+                cv2.fillPoly(mask, [np.round(self._px(poly, w, h) - offset).astype(np.int32)], 0)
+        self._mask = mask
+        self._shape = (h, w)
+
+    def box(self, frame: np.ndarray) -> Tuple[int, int, int, int]:
+        """Пиксельный прямоугольник ROI (x0, y0, x1, y1) для кадра такого размера."""
+        self._prepare(*frame.shape[:2])
+        return self._box
+
+    def imgsz(self, frame: np.ndarray, img: int) -> Tuple[int, int]:
+        x0, y0, x1, y1 = self.box(frame)
+        return roi_imgsz(x1 - x0, y1 - y0, img)
+
+    # ─────────────── кадры и боксы ───────────────
+    def crop(self, frame: np.ndarray) -> np.ndarray:
+        """Вырезает ROI; закрашенные области заполняются PAD_VALUE."""
+        x0, y0, x1, y1 = self.box(frame)
+        crop = frame[y0:y1, x0:x1]
+        if self._mask is None:
+            return crop
+        out = np.full_like(crop, PAD_VALUE)
+        np.copyto(out, crop, where=self._mask[..., None].astype(bool))
+        return out
+
+    def to_full(self, xyxy: np.ndarray) -> np.ndarray:
+        """Боксы из координат ROI → координаты полного кадра (после crop())."""
+        x0, y0, _, _ = self._box
+        return np.asarray(xyxy, dtype=np.float32) + np.array([x0, y0, x0, y0], dtype=np.float32)
+
+    def paste(self, frame: np.ndarray, crop: np.ndarray) -> np.ndarray:
+        """
+        Вставляет отрисованный crop обратно в копию кадра и обводит ROI.
+        Закрашенные (вне полигона / exclude) пиксели берутся из исходного кадра —
+        маска применяется только ко входу модели, а не к архивному видео.
+        """
+        x0, y0, x1, y1 = self.box(frame)
+        out = frame.copy()
+        if self._mask is None:
+            out[y0:y1, x0:x1] = crop
+        else:
+            np.copyto(out[y0:y1, x0:x1], crop, where=self._mask[..., None].astype(bool))
+        cv2.rectangle(out, (x0, y0), (x1 - 1, y1 - 1), (255, 255, 0), 1)
+        return out
@@ -0,0 +1,211 @@
+# src/utils/video.py
+
+"""
+video.py
+Запись видео с боксами: единый интерфейс над несколькими бэкендами.
+
+• FfmpegWriter  — сырые BGR-кадры по pipe в подпроцесс ffmpeg
+                  (libx264 / любой другой кодек, preset + CRF, опционально scale);
+• OpenCVWriter  — прежний cv2.VideoWriter (mp4v), запасной вариант;
+• AsyncWriter   — обёртка с очередью: кодирование идёт в отдельном потоке
+                  и не блокирует цикл инференса.
+
+Фабрика open_writer() выбирает бэкенд: "auto" → ffmpeg, если он есть в PATH,
+иначе OpenCV.
+"""
+
+from __future__ import annotations
+
+import queue
+import shutil
+import subprocess
+import tempfile
+import threading
+from pathlib import Path
+from typing import Optional, Protocol, Tuple
+
+import cv2
+import numpy as np
+
+from src.config import BACKENDS
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+
+class VideoWriter(Protocol):
+    """Минимальный контракт писателя: write(frame) + close()."""
+
+    def write(self, frame: np.ndarray) -> None: ...
+
+    def close(self) -> None: ...
+
+
+# ───────────────────────────── OpenCV ──────────────────────────────────── #
+class OpenCVWriter:
+    """cv2.VideoWriter c fourcc mp4v — медленно и крупно, зато без внешних зависимостей."""
+
+    def __init__(self, path: Path, fps: float, size: Tuple[int, int], fourcc: str = "mp4v"):
+        self.path = Path(path)
+        self._writer = cv2.VideoWriter(str(self.path), cv2.VideoWriter_fourcc(*fourcc), fps, size)
+        if not self._writer.isOpened():
+            raise RuntimeError(f"cv2.VideoWriter не смог открыть {self.path}")
+
+    def write(self, frame: np.ndarray) -> None:
+        self._writer.write(frame)
+
+    def close(self) -> None:
+        self._writer.release()
+
+
+# ───────────────────────────── ffmpeg ──────────────────────────────────── #
+class FfmpegWriter:
+    """
+    Пишет кадры в stdin процесса ffmpeg (rawvideo bgr24 → codec).
+
+    :param codec:  кодек ffmpeg (libx264, libx265, h264_nvenc, ...)
+    :param preset: скорость/степень сжатия кодировщика (ultrafast … veryslow)
+    :param crf:    качество (меньше → лучше и крупнее); 23 — значение x264 по умолчанию
+    :param scale:  высота выходного ролика в px (ширина подбирается по пропорции);
+                   None — исходное разрешение
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        fps: float,
+        size: Tuple[int, int],
+        codec: str = "libx264",
+        preset: str = "veryfast",
+        crf: int = 23,
+        scale: Optional[int] = None,
+    ):
+        exe = shutil.which("ffmpeg")
+        if exe is None:
+            raise FileNotFoundError("ffmpeg не найден в PATH")
+        self.path = Path(path)
+        self.size = size
+        w, h = size
+        cmd = [
+            exe, "-y", "-loglevel", "error",
+            "-f", "rawvideo", "-pix_fmt", "bgr24",
+            "-s", f"{w}x{h}", "-r", f"{fps or 25:.3f}",
+            "-i", "-",
+            "-an", "-c:v", codec,
+        ]
+        if codec.startswith("libx26"):
+            cmd += ["-preset", preset, "-crf", str(crf)]
+        if scale:
+            cmd += ["-vf", f"scale=-2:{int(scale)}"]
+        cmd += ["-pix_fmt", "yuv420p", str(self.path)]
+        # stderr — во временный файл, а не в pipe: непрочитанный pipe на длинном
+        # ролике переполняется, и ffmpeg (а с ним и писатель) блокируется
+        self._log = tempfile.TemporaryFile()
+        self._proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stderr=self._log)
+
+    def _stderr_tail(self, limit: int = 4000) -> str:
+        """Последние *limit* байт лога ffmpeg."""
+        self._log.seek(0, 2)
+        self._log.seek(max(0, self._log.tell() - limit))
+        return self._log.read().decode(errors="replace")
+
+    def write(self, frame: np.ndarray) -> None:
+        if (frame.shape[1], frame.shape[0]) != self.size:
+            frame = cv2.resize(frame, self.size)
+        try:
+            self._proc.stdin.write(np.ascontiguousarray(frame).tobytes())
+        except BrokenPipeError as e:
+            self._proc.wait()
+            raise RuntimeError(f"ffmpeg завершился с ошибкой:\n{self._stderr_tail()}") from e
+
+    def close(self) -> None:
+        try:
+            self._proc.stdin.close()
+        except BrokenPipeError:                           # ffmpeg уже упал — код и лог ниже
+            pass
+        code = self._proc.wait()
+        err = self._stderr_tail()
+        self._log.close()
+        if code != 0:
+            raise RuntimeError(f"ffmpeg завершился с кодом {code}:\n{err}")
+
+
+# ───────────────────────────── async ───────────────────────────────────── #
+class AsyncWriter:
+    """
+    Выносит write() базового писателя в фоновый поток.
+    Очередь ограничена maxsize кадров — если кодировщик не успевает,
+    основной цикл подождёт, а не съест всю память.
+    """
+
+    _STOP = object()
+
+    def __init__(self, inner: VideoWriter, maxsize: int = 64):
+        self.inner = inner
+        self._q: queue.Queue = queue.Queue(maxsize=maxsize)
+        self._error: Optional[BaseException] = None
+        self._thread = threading.Thread(target=self._loop, name="video-writer", daemon=True)
+        self._thread.start()
+
+    def _loop(self) -> None:
+        while True:
+            frame = self._q.get()
+            if frame is self._STOP:
+                break
+            if self._error is not None:
+                continue                                  # дочитываем очередь, чтобы не заблокировать put()
+            try:
+                self.inner.write(frame)
+            except BaseException as e:                    # пробрасываем в основной поток
+                self._error = e
+
+    def write(self, frame: np.ndarray) -> None:
+        if self._error is not None:
+            raise self._error
+        self._q.put(frame)
+
+    def close(self) -> None:
+        self._q.put(self._STOP)
+        self._thread.join()
+        self.inner.close()
+        if self._error is not None:
+            raise self._error
+
+
+# ───────────────────────────── factory ─────────────────────────────────── #
+def open_writer(
+    path: Path,
+    fps: float,
+    size: Tuple[int, int],
+    backend: str = "auto",
+    codec: str = "libx264",
+    preset: str = "veryfast",
+    crf: int = 23,
+    scale: Optional[int] = None,
+    queue_size: int = 64,
+) -> VideoWriter:
+    """
+    Создаёт писателя по имени бэкенда.
+    queue_size > 0 → запись через AsyncWriter, 0 → синхронно.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Неизвестный backend «{backend}», ожидается один из {BACKENDS}")
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+
+    if backend == "auto":
+        backend = "ffmpeg" if shutil.which("ffmpeg") else "opencv"
+        if backend == "opencv":
+            logger.warning("ffmpeg не найден — пишу через cv2.VideoWriter (mp4v)")
+
+    if backend == "ffmpeg":
+        writer: VideoWriter = FfmpegWriter(path, fps, size, codec=codec, preset=preset, crf=crf, scale=scale)
+    else:
+        if scale:
+            logger.warning("scale поддерживается только ffmpeg-бэкендом — игнорирую")
+        writer = OpenCVWriter(path, fps, size)
+
+    logger.info(f"Видео-писатель: {backend}"
+                + (f" ({codec}, preset={preset}, crf={crf})" if backend == "ffmpeg" else "")
+                + (", async" if queue_size > 0 else ""))
+    return AsyncWriter(writer, maxsize=queue_size) if queue_size > 0 else writer
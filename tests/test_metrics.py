@@ -0,0 +1,145 @@
+# tests/test_metrics.py
+"""
+Проверки NumPy-пересчёта метрик (src/utils/metrics.py) на синтетических боксах:
+идеальные предсказания, ложные срабатывания, пустые наборы, разбивка по размерам
+совпадение AP/P/R с ultralytics.utils.metrics.ap_per_class (зашитый эталон
+и, если установлен ultralytics, — прямое сравнение).
+"""
+
+import numpy as np
+import pytest
+
+from src.utils.metrics import (IOU_THRESHOLDS, ap_per_class, conf_sweep, detection_metrics,
+                               match_predictions, nms, size_breakdown)
+
+NC = 3
+
+
+def _gt():
+    """3 изображения, 5 объектов разных классов (xyxy в долях кадра)."""
+    img = np.array([0, 0, 1, 2, 2], dtype=np.int32)
+    boxes = np.array([[0.10, 0.10, 0.40, 0.40],
+                      [0.50, 0.50, 0.90, 0.90],
+                      [0.20, 0.30, 0.60, 0.70],
+                      [0.00, 0.00, 0.10, 0.10],
+                      [0.30, 0.30, 0.80, 0.90]], dtype=np.float32)
+    cls = np.array([0, 1, 2, 0, 1], dtype=np.int16)
+    return img, boxes, cls
+
+
+def _perfect():
+    img, boxes, cls = _gt()
+    return img, boxes, np.full(len(img), 0.9, np.float32), cls
+
+
+def test_perfect_predictions():
+    m = detection_metrics(*_perfect(), *_gt(), nc=NC)
+    assert m["mAP50"] == pytest.approx(0.995, abs=1e-3)          # 101-точечный AP как у Ultralytics/COCO
+    assert m["mAP50-95"] == pytest.approx(0.995, abs=1e-3)
+    assert m["precision"] == pytest.approx(1.0, abs=1e-3)
+    assert m["recall"] == pytest.approx(1.0, abs=1e-3)
+    assert m["dataset_size"] == 3
+
+
+def test_false_positives_lower_precision_and_ap():
+    p_img, p_boxes, p_scores, p_cls = _perfect()
+    # уверенный FP на каждом изображении — выше по score, чем все TP
+    fp_img = np.array([0, 1, 2], dtype=np.int32)
+    fp_boxes = np.array([[0.7, 0.0, 0.8, 0.1]] * 3, dtype=np.float32)
+    fp_cls = np.array([0, 2, 1], dtype=np.int16)
+    img = np.concatenate([p_img, fp_img])
+    order = np.argsort(img, kind="stable")
+    preds = (img[order], np.concatenate([p_boxes, fp_boxes])[order],
+             np.concatenate([p_scores, np.full(3, 0.95, np.float32)])[order],
+             np.concatenate([p_cls, fp_cls])[order])
+    m = detection_metrics(*preds, *_gt(), nc=NC)
+    assert m["recall"] == pytest.approx(1.0, abs=1e-3)
+    assert m["mAP50"] < 0.9
+    assert m["_raw"]["n_tp50"] == 5 and m["_raw"]["n_pred"] == 8
+
+
+def test_wrong_class_is_not_a_match():
+    _, boxes, cls = _gt()
+    tp = match_predictions(boxes, (cls + 1) % NC, boxes, cls)
+    assert tp.shape == (len(boxes), len(IOU_THRESHOLDS))
+    assert not tp.any()
+
+
+def test_duplicate_prediction_counts_once():
+    gt = np.array([[0.1, 0.1, 0.5, 0.5]], np.float32)
+    preds = np.array([[0.1, 0.1, 0.5, 0.5], [0.11, 0.1, 0.5, 0.5]], np.float32)
+    tp = match_predictions(preds, np.zeros(2, np.int16), gt, np.zeros(1, np.int16))
+    assert tp[:, 0].sum() == 1
+
+
+def test_empty_inputs():
+    e_img, e_boxes = np.zeros(0, np.int32), np.zeros((0, 4), np.float32)
+    e_scores, e_cls = np.zeros(0, np.float32), np.zeros(0, np.int16)
+    m = detection_metrics(e_img, e_boxes, e_scores, e_cls, e_img, e_boxes, e_cls, nc=NC, n_images=2)
+    assert m["mAP50"] == 0.0 and m["mAP50-95"] == 0.0
+    m = detection_metrics(e_img, e_boxes, e_scores, e_cls, *_gt(), nc=NC)      # нет предсказаний
+    assert m["mAP50"] == 0.0 and m["recall"] == 0.0
+    m = detection_metrics(*_perfect(), e_img, e_boxes, e_cls, nc=NC)           # нет разметки
+    assert m["mAP50"] == 0.0
+
+
+def test_conf_threshold_and_sweep():
+    img, boxes, scores, cls = _perfect()
+    scores = np.array([0.9, 0.2, 0.9, 0.9, 0.2], np.float32)
+    rows = conf_sweep(img, boxes, scores, cls, *_gt(), nc=NC, confs=[0.1, 0.5])
+    assert rows[0]["recall"] == pytest.approx(1.0) and rows[0]["detections"] == 5
+    assert rows[1]["recall"] == pytest.approx(0.6) and rows[1]["precision"] == pytest.approx(1.0)
+
+
+def test_nms_is_per_class():
+    boxes = np.array([[0, 0, 1, 1], [0, 0, 1, 1], [0, 0, 1, 1]], np.float32)
+    keep = nms(boxes, np.array([0.9, 0.8, 0.7], np.float32), np.array([0, 0, 1]), iou=0.5)
+    assert sorted(keep.tolist()) == [0, 2]
+
+
+def test_size_breakdown_buckets():
+    shapes = np.array([[640, 640]] * 3, dtype=np.int32)
+    out = size_breakdown(*_perfect(), *_gt(), shapes=shapes, nc=NC)
+    # на кадре 640×640 бокс 0.1×0.1 — 64×64 px (medium), остальные > 96² px (large)
+    assert out["small"] == {"n_gt": 0, "mAP50": None, "mAP50-95": None}
+    assert out["medium"]["n_gt"] == 1
+    assert out["large"]["n_gt"] == 4
+    assert out["large"]["mAP50"] == pytest.approx(0.995, abs=1e-3)
+
+    small = np.array([[32, 32]] * 3, dtype=np.int32)           # те же боксы на кадрах 32×32 — все < 32² px
+    out = size_breakdown(*_perfect(), *_gt(), shapes=small, nc=NC)
+    assert out["small"]["n_gt"] == 5 and out["large"]["n_gt"] == 0
+
+
+def _ranked(seed: int = 0, n: int = 400):
+    """
+    Синтетика, где TP зависит от conf (уверенные чаще верны): у F1-кривой
+    есть выраженный пик, и окно сглаживания влияет на выбранную рабочую точку.
+    """
+    rng = np.random.default_rng(seed)
+    conf = rng.random(n).astype(np.float32)
+    tp = rng.random((n, len(IOU_THRESHOLDS))) < conf[:, None] * np.linspace(1.0, 0.4, len(IOU_THRESHOLDS))
+    return tp, conf, rng.integers(0, NC, n), rng.integers(0, NC, 300)
+
+
+def test_ap_matches_ultralytics_reference():
+    # эталон — ultralytics 8.3.165 ap_per_class на _ranked(0), посчитан один раз
+    ours = ap_per_class(*_ranked(0), NC)
+    np.testing.assert_allclose(ours["p"], [0.657845, 0.736425, 0.770021], atol=1e-6)
+    np.testing.assert_allclose(ours["r"], [0.666667, 0.651376, 0.881132], atol=1e-6)
+    np.testing.assert_allclose(ours["ap"][:, 0], [0.707148, 0.699259, 0.860918], atol=1e-6)
+    np.testing.assert_allclose(ours["ap"].mean(1), [0.464201, 0.405722, 0.464485], atol=1e-6)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_ap_parity_with_ultralytics(seed):
+    um = pytest.importorskip("ultralytics.utils.metrics")
+    tp, conf, pred_cls, gt_cls = _ranked(seed)
+
+    ours = ap_per_class(tp, conf, pred_cls, gt_cls, NC)
+    ref = um.ap_per_class(tp, conf, pred_cls, gt_cls)
+    _, _, p, r, _, ap, classes = ref[:7]
+    np.testing.assert_array_equal(ours["classes"], classes)
+    np.testing.assert_allclose(ours["ap"], ap, atol=1e-6)
+    np.testing.assert_allclose(ours["p"], p, atol=1e-6)
+    np.testing.assert_allclose(ours["r"], r, atol=1e-6)